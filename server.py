@@ -12,12 +12,20 @@ logger = logging.getLogger("ptx-mcp-server")
 # This is NOT recommended for production.
 transport_security = TransportSecuritySettings(enable_dns_rebinding_protection=False)
 
+# server.workers > 1 in config/tools.yml: several worker processes behind the same port,
+# SSH sessions owned by one broker process (see tools/ssh_broker.py)
+from tools.ssh_broker import server_settings
+
+settings = server_settings()
+
 # Initialize FastMCP server (bind to all interfaces for Docker)
 mcp = FastMCP(
     "Juniper PTX Server",
     host="0.0.0.0",
     port=8000,
     transport_security=transport_security,
+    # Requests of one client may land on any worker, so no session state between requests
+    stateless_http=settings["workers"] > 1,
 )
 
 # Register all MCP tools (one tool per file under tools/)
@@ -25,8 +33,29 @@ from tools import register_all_tools
 
 register_all_tools(mcp)
 
+
+def create_app():
+    """ASGI app for each worker process in multi-process mode (uvicorn factory)."""
+    return mcp.streamable_http_app()
+
+
 if __name__ == "__main__":
     logger.warning("⚠️  MCP DNS rebinding protection DISABLED (insecure mode)")
     logger.warning("⚠️  This should ONLY be used in lab/dev environments")
-    print("Starting MCP server on 0.0.0.0:8000 with HTTP Stream transport")
-    mcp.run(transport="streamable-http")
+    workers = settings["workers"]
+    if workers > 1:
+        import uvicorn
+
+        from tools.ssh_broker import start_broker_process
+
+        # The broker also runs the telemetry poller, so it polls once per server
+        start_broker_process(settings)
+        print(f"Starting MCP server on 0.0.0.0:8000 with HTTP Stream transport ({workers} workers, shared SSH broker)")
+        uvicorn.run("server:create_app", factory=True, host=mcp.settings.host, port=mcp.settings.port, workers=workers)
+    else:
+        # Optional background telemetry collection (telemetry.enabled in config/tools.yml)
+        from tools.telemetry_poller import start_telemetry_poller
+
+        start_telemetry_poller()
+        print("Starting MCP server on 0.0.0.0:8000 with HTTP Stream transport")
+        mcp.run(transport="streamable-http")
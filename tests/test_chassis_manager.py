@@ -0,0 +1,66 @@
+import pytest
+
+from tools import chassis_manager
+from tools.chassis_manager import _build_inventory, get_chassis, select_chassis
+
+INVENTORY = {
+    "transport_profiles": {
+        "default": {"window_size": 4194304},
+        "oob": {"compress": True, "ciphers": ["aes128-ctr"]},
+    },
+    "groups": {
+        "ams-core": {"username": "ops", "transport": "oob", "tags": {"site": "ams1", "role": "core"}},
+        "fra": {"username": "fra-ops", "tags": {"site": "fra2"}},
+    },
+    "chassis": {
+        "ams-p1": {"host": "10.0.0.1", "group": "ams-core"},
+        "ams-p2": {"host": "10.0.0.2", "group": "ams-core", "tags": {"platform": "ptx10008"}},
+        "fra-p1": {"host": "10.1.0.1", "groups": ["fra"], "username": "local", "tags": {"role": "core"}},
+        "lab1": {"host": "lab1.example.net", "tags": {"role": "lab"}},
+        "broken": {"username": "x"},
+    },
+}
+
+
+@pytest.fixture(autouse=True)
+def inventory(monkeypatch):
+    inv = _build_inventory(INVENTORY)
+    monkeypatch.setattr(chassis_manager, "load_inventory", lambda: inv)
+    return inv
+
+
+def test_groups_supply_defaults_and_chassis_fields_win(inventory):
+    assert "broken" not in inventory.chassis
+    assert inventory.chassis["ams-p1"]["username"] == "ops"
+    assert inventory.chassis["fra-p1"]["username"] == "local"
+    assert inventory.chassis["ams-p2"]["tags"] == {"site": "ams1", "role": "core", "platform": "ptx10008"}
+
+
+def test_transport_profiles_resolve_with_default(inventory):
+    assert inventory.chassis["ams-p1"]["transport"]["name"] == "oob"
+    assert inventory.chassis["lab1"]["transport"]["name"] == "default"
+
+
+@pytest.mark.parametrize(
+    "selector, expected",
+    [
+        (None, ["ams-p1", "ams-p2", "fra-p1", "lab1"]),
+        ("role=core", ["ams-p1", "ams-p2", "fra-p1"]),
+        ("role=core,site=ams*", ["ams-p1", "ams-p2"]),
+        ("site=ams1|fra2", ["ams-p1", "ams-p2", "fra-p1"]),
+        ("group=fra", ["fra-p1"]),
+        ("host=*.example.net", ["lab1"]),
+        ("ams-p?", ["ams-p1", "ams-p2"]),
+        ("platform=ptx10008", ["ams-p2"]),
+        ("role=core,site=lab*", []),
+        ("nosuchtag=x", []),
+    ],
+)
+def test_select_chassis(selector, expected):
+    assert select_chassis(selector) == expected
+
+
+def test_get_chassis_accepts_selector_matching_one():
+    assert get_chassis("platform=ptx10008")["id"] == "ams-p2"
+    with pytest.raises(ValueError):
+        get_chassis("role=core")
@@ -0,0 +1,54 @@
+from contextlib import ExitStack
+
+import pytest
+
+from tools import chassis_manager, chassis_state, get_facts, log_follow
+from tools.chassis_manager import _build_inventory
+
+INVENTORY = {
+    "chassis": {
+        "ams-p1": {"host": "10.0.0.1", "tags": {"role": "core"}},
+        "lab1": {"host": "10.9.0.1", "tags": {"role": "lab"}},
+    },
+}
+
+
+class FakeSession:
+    def __init__(self):
+        self._exit_stack = ExitStack()
+
+
+@pytest.fixture(autouse=True)
+def state(monkeypatch):
+    inv = _build_inventory(INVENTORY)
+    monkeypatch.setattr(chassis_manager, "load_inventory", lambda: inv)
+    monkeypatch.setattr(chassis_state, "_ensure_watcher", lambda: None)
+    monkeypatch.setattr(chassis_state, "_subscribers", {})
+    monkeypatch.setattr(chassis_state, "_facts", {})
+
+
+def test_subscribe_rejects_selector_uris():
+    session = FakeSession()
+    with pytest.raises(ValueError, match="ptx://lab1/facts"):
+        chassis_state.subscribe("ptx://role=lab/facts", session)
+    chassis_state.subscribe("ptx://lab1/facts", session)
+    assert chassis_state._subscribers == {"ptx://lab1/facts": {session}}
+
+
+def test_read_facts_via_selector_caches_under_chassis_id(monkeypatch):
+    calls = []
+    monkeypatch.setattr(get_facts, "_collect_facts", lambda c: calls.append(c["id"]) or f"facts of {c['id']}")
+    assert chassis_state.read_facts("role=lab") == "facts of lab1"
+    assert chassis_state.read_facts("lab1") == "facts of lab1"
+    assert calls == ["lab1"] and list(chassis_state._facts) == ["lab1"]
+
+
+def test_session_teardown_is_hooked_once_and_runs_every_callback():
+    session = FakeSession()
+    for _ in range(3):
+        chassis_state.subscribe("ptx://ams-p1/config", session)
+        log_follow.set_session_level(session, "warning")
+    assert len(session._exit_stack._exit_callbacks) == 1
+    session._exit_stack.close()
+    assert chassis_state._subscribers == {}
+    assert session not in log_follow._session_levels
@@ -0,0 +1,116 @@
+import pytest
+
+from tools.config_tree import find_nodes, parse_config_text, parse_path, render_matches
+
+CONFIG = """\
+## Last commit: 2026-02-05 01:09:00 UTC by admin
+version 23.4R1;
+system {
+    host-name ptx1;
+    /* managed by automation */
+    login {
+        user admin {
+            authentication {
+                encrypted-password "$6$abc"; ## SECRET-DATA
+            }
+        }
+    }
+}
+interfaces {
+    et-0/0/0 {
+        unit 0 {
+            family inet {
+                address 192.0.2.1/31;
+            }
+        }
+    }
+}
+protocols {
+    bgp {
+        group CORE {
+            type internal;
+            neighbor 10.0.0.1;
+            neighbor 10.0.0.2;
+        }
+        inactive: group EDGE {
+            type external;
+        }
+    }
+    lldp {
+        interface all;
+    }
+}
+policy-options {
+    prefix-list LOOPBACKS {
+        10.255.0.0/24;
+    }
+    community C1 members [ 65000:1 65000:2 ];
+}
+"""
+
+
+@pytest.fixture(scope="module")
+def root():
+    return parse_config_text(CONFIG)
+
+
+def lookup(root, path, fmt="text"):
+    matches, exact = find_nodes(root, parse_path(path))
+    return render_matches(matches, fmt, exact)
+
+
+def test_parse_skips_comments_and_keeps_quoted_values(root):
+    assert list(root.children) == ["version 23.4R1", "system", "interfaces", "protocols", "policy-options"]
+    auth = find_nodes(root, parse_path("system login user admin authentication"))[0][0][1]
+    assert list(auth.children) == ['encrypted-password "$6$abc"']
+
+
+def test_text_lookup_prints_subtree_contents(root):
+    assert lookup(root, "protocols bgp group CORE") == (
+        "type internal;\nneighbor 10.0.0.1;\nneighbor 10.0.0.2;"
+    )
+
+
+def test_partial_key_matches_all_statements_starting_with_it(root):
+    matches, exact = find_nodes(root, parse_path("protocols bgp group"))
+    assert not exact
+    assert [node.key for _, node in matches] == ["group CORE", "group EDGE"]
+
+
+def test_single_prefix_match_keeps_its_header(root):
+    assert lookup(root, "interfaces et-0/0/0 unit").splitlines() == [
+        "unit 0 {",
+        "    family inet {",
+        "        address 192.0.2.1/31;",
+        "    }",
+        "}",
+    ]
+    assert lookup(root, "interfaces et-0/0/0 unit 0").splitlines()[0] == "family inet {"
+
+
+def test_set_lookup_uses_absolute_paths_and_flags(root):
+    assert lookup(root, "protocols bgp", "set").splitlines() == [
+        "set protocols bgp group CORE type internal",
+        "set protocols bgp group CORE neighbor 10.0.0.1",
+        "set protocols bgp group CORE neighbor 10.0.0.2",
+        "set protocols bgp group EDGE type external",
+        "deactivate protocols bgp group EDGE",
+    ]
+
+
+def test_set_expands_leaf_lists(root):
+    assert lookup(root, "policy-options", "set").splitlines() == [
+        "set policy-options prefix-list LOOPBACKS 10.255.0.0/24",
+        "set policy-options community C1 members 65000:1",
+        "set policy-options community C1 members 65000:2",
+    ]
+
+
+def test_missing_path_has_no_matches(root):
+    assert find_nodes(root, parse_path("protocols ospf")) == ([], False)
+
+
+@pytest.mark.parametrize("path", ["protocols | display xml", "system; request", "a `id`", "interfaces et-*"])
+def test_parse_path_rejects_unsafe_tokens(path):
+    with pytest.raises(ValueError):
+        parse_path(path)
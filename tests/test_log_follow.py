@@ -0,0 +1,86 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from tools import log_follow
+
+CHASSIS = {"id": "ch0", "host": "192.0.2.1"}
+
+
+class FakeChannel:
+    """'tail -F' channel: yields the given output, then blocks until the client is closed."""
+
+    def __init__(self, output, closed):
+        self.output = list(output)
+        self.closed = closed
+
+    def exec_command(self, command):
+        pass
+
+    def recv(self, size):
+        if self.output:
+            return self.output.pop(0)
+        self.closed.wait()
+        return b""
+
+
+class FakeClient:
+    def __init__(self, output):
+        self.closed = threading.Event()
+        self.output = output
+
+    def get_transport(self):
+        return self
+
+    def open_session(self):
+        return FakeChannel(self.output, self.closed)
+
+    def close(self):
+        self.closed.set()
+
+
+class FakeSession:
+    def __init__(self):
+        self.messages = []
+
+    async def send_log_message(self, level, data, logger=None):
+        self.messages.append((level, data))
+
+
+@pytest.fixture
+def clients(monkeypatch):
+    opened = []
+
+    def open_ssh_client(chassis, timeout_sec=30):
+        opened.append(FakeClient([b"line 1\nline 2\n"]))
+        return opened[-1]
+
+    monkeypatch.setattr(log_follow, "open_ssh_client", open_ssh_client)
+    return opened
+
+
+def test_device_follow_does_not_hold_default_executor(clients):
+    async def main():
+        # A single default-executor worker: a follow running on it would starve to_thread below
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=1))
+        session = FakeSession()
+        subs = [log_follow.start_subscription(session, "device", None, chassis=CHASSIS, filename="messages")
+                for _ in range(2)]
+        await asyncio.sleep(0.1)  # let both follows start streaming
+        assert await asyncio.wait_for(asyncio.to_thread(lambda: "free"), timeout=5) == "free"
+        for sub in subs:
+            log_follow.stop_subscription(sub.id, session)
+        await asyncio.wait_for(asyncio.gather(*(sub.task for sub in subs)), timeout=5)
+        return session, subs
+
+    session, subs = asyncio.run(main())
+    assert len(clients) == 2 and all(c.closed.is_set() for c in clients)
+    lines = [data["lines"] for level, data in session.messages if level == "info"]
+    assert lines == [["line 1", "line 2"], ["line 1", "line 2"]]
+    assert [data["stopped"] for level, data in session.messages if level == "notice"] == ["unsubscribed"] * 2
+    for t in threading.enumerate():
+        if t.name.startswith("follow-log-"):
+            t.join(timeout=5)
+            assert not t.is_alive()
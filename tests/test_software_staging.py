@@ -0,0 +1,124 @@
+import hashlib
+import io
+
+import pytest
+
+from tools import software_staging
+from tools.software_staging import stage_image
+
+CHASSIS = {"id": "ch0", "host": "192.0.2.1"}
+IMAGE = bytes(range(256)) * 4096  # 1 MiB
+
+
+class FakeRemoteFile(io.BytesIO):
+    def __init__(self, fs, path, data):
+        super().__init__(data)
+        self.fs, self.path = fs, path
+
+    def set_pipelined(self, pipelined=True):
+        pass
+
+    def close(self):
+        self.fs[self.path] = self.getvalue()
+        super().close()
+
+
+class FakeSFTP:
+    def __init__(self, fs):
+        self.fs = fs
+
+    def stat(self, path):
+        if path not in self.fs:
+            raise IOError(path)
+        return type("Attr", (), {"st_size": len(self.fs[path])})()
+
+    def open(self, path, mode):
+        if "r" in mode and path not in self.fs:
+            raise IOError(path)
+        return FakeRemoteFile(self.fs, path, self.fs.get(path, b"") if "r" in mode else b"")
+
+    def remove(self, path):
+        del self.fs[path]
+
+    def rename(self, old, new):
+        self.fs[new] = self.fs.pop(old)
+
+
+class FakeDevice:
+    """Remote filesystem plus the exec/SFTP calls stage_image makes."""
+
+    def __init__(self, files=None, corrupt_uploads=0):
+        self.fs = dict(files or {})
+        self.corrupt_uploads = corrupt_uploads
+        self.sftp_opened = 0
+
+    def client(self, chassis, timeout_sec=30):
+        device = self
+
+        class Client:
+            def exec_command(self, command, timeout=None):
+                path = command.split()[-1]
+                data = device.fs.get(path)
+                if path.endswith(".part") and device.corrupt_uploads and data:
+                    device.corrupt_uploads -= 1
+                    data = bytes([data[0] ^ 0xFF]) + data[1:]
+                out = f"SHA256 ({path}) = {hashlib.sha256(data).hexdigest()}\n" if data is not None else "error"
+                return None, io.BytesIO(out.encode()), io.BytesIO()
+
+            def open_sftp(self):
+                device.sftp_opened += 1
+                return FakeSFTP(device.fs)
+
+            def close(self):
+                pass
+
+        return Client()
+
+
+@pytest.fixture
+def image(tmp_path):
+    p = tmp_path / "junos-install-ptx.tgz"
+    p.write_bytes(IMAGE)
+    return p
+
+
+def stage(monkeypatch, device, image, **kwargs):
+    monkeypatch.setattr(software_staging, "open_ssh_client", device.client)
+    return stage_image(CHASSIS, image, remote_dir="/var/tmp", chunk_size=65536, **kwargs)
+
+
+def test_present_image_is_skipped(monkeypatch, image):
+    device = FakeDevice({"/var/tmp/junos-install-ptx.tgz": IMAGE})
+    result = stage(monkeypatch, device, image)
+    assert result.status == "present" and result.bytes_sent == 0
+    assert device.sftp_opened == 0
+
+
+def test_resume_from_partial_upload(monkeypatch, image):
+    device = FakeDevice({"/var/tmp/junos-install-ptx.tgz.part": IMAGE[:300000]})
+    result = stage(monkeypatch, device, image)
+    assert result.status == "uploaded"
+    assert result.bytes_sent == len(IMAGE) - 300000
+    assert device.fs == {"/var/tmp/junos-install-ptx.tgz": IMAGE}
+
+
+def test_partial_larger_than_image_restarts(monkeypatch, image):
+    device = FakeDevice({"/var/tmp/junos-install-ptx.tgz.part": IMAGE + b"extra"})
+    result = stage(monkeypatch, device, image)
+    assert result.status == "uploaded" and result.bytes_sent == len(IMAGE)
+    assert device.fs == {"/var/tmp/junos-install-ptx.tgz": IMAGE}
+
+
+def test_checksum_mismatch_discards_partial_and_retries(monkeypatch, image):
+    device = FakeDevice(corrupt_uploads=1)
+    result = stage(monkeypatch, device, image, retries=2)
+    assert result.status == "uploaded"
+    assert result.bytes_sent == 2 * len(IMAGE)
+    assert device.fs == {"/var/tmp/junos-install-ptx.tgz": IMAGE}
+
+
+def test_checksum_mismatch_fails_without_retries_left(monkeypatch, image):
+    device = FakeDevice(corrupt_uploads=1)
+    result = stage(monkeypatch, device, image, retries=1)
+    assert not result.ok and "checksum mismatch" in result.message
+    assert device.fs == {}
@@ -0,0 +1,169 @@
+import socket
+import time
+
+import pytest
+
+from tools import ssh_broker
+from tools.common import run_cli_command_on_ptx, run_cli_stdin_on_ptx
+from tools.ssh_broker import SessionPool, config_generation, device_session
+
+CHASSIS = {"id": "ch0", "host": "192.0.2.1", "username": "ops"}
+
+
+class FakeTransport:
+    def __init__(self):
+        self.active = True
+        self.channels_open = True  # False: the device dropped the connection unnoticed
+
+    def is_active(self):
+        return self.active
+
+    def set_keepalive(self, interval):
+        pass
+
+    def open_session(self, timeout=None):
+        if not self.channels_open:
+            raise EOFError("connection dropped")
+        return self
+
+    def close(self):
+        pass
+
+
+class FakeClient:
+    def __init__(self):
+        self.transport = FakeTransport()
+        self.closed = False
+
+    def get_transport(self):
+        return self.transport
+
+    def close(self):
+        self.closed = True
+        self.transport.active = False
+
+
+@pytest.fixture
+def make_pool():
+    pools = []
+
+    def make(max_per_chassis=2, idle_timeout_sec=300, wait_sec=5):
+        pool = SessionPool(max_per_chassis, idle_timeout_sec, wait_sec)
+        pool.connected = []
+
+        def connect(chassis, timeout_sec):
+            pool.connected.append(FakeClient())
+            return pool.connected[-1]
+
+        pool._connect = connect
+        pools.append(pool)
+        return pool
+
+    yield make
+    for pool in pools:
+        pool.close()
+
+
+def test_idle_connections_are_reused_per_user(make_pool):
+    pool = make_pool()
+    used = []
+    for chassis in (CHASSIS, CHASSIS, dict(CHASSIS, username="other")):
+        assert pool.run(chassis, lambda c: used.append(c) or (True, "ok")) == (True, "ok")
+    assert len(pool.connected) == 2
+    assert used == [pool.connected[0], pool.connected[0], pool.connected[1]]
+
+
+def test_dropped_idle_connection_is_replaced_before_the_command(make_pool):
+    pool = make_pool()
+    pool.run(CHASSIS, lambda c: (True, "ok"))
+    pool.connected[0].transport.channels_open = False
+    used = []
+    assert pool.run(CHASSIS, lambda c: used.append(c) or (True, "ok")) == (True, "ok")
+    assert used == [pool.connected[1]] and pool.connected[0].closed
+
+
+def test_command_failing_on_a_reused_connection_is_not_rerun(make_pool):
+    pool = make_pool()
+    pool.run(CHASSIS, lambda c: (True, "ok"))
+    calls = []
+
+    def commit_and_drop(client):
+        calls.append(client)
+        client.transport.active = False
+        return (False, "connection lost")
+
+    assert pool.run(CHASSIS, commit_and_drop) == (False, "connection lost")
+    assert len(calls) == 1 and len(pool.connected) == 1
+
+
+def test_busy_chassis_fails_after_wait(make_pool):
+    pool = make_pool(max_per_chassis=1, wait_sec=0.2)
+    assert pool.acquire(CHASSIS)
+    # Same device through another inventory entry shares the slot; other devices do not
+    ok, out = pool.run(dict(CHASSIS, id="alias"), lambda c: (True, "ok"))
+    assert not ok and "busy" in out
+    assert pool.run(dict(CHASSIS, host="192.0.2.2"), lambda c: (True, "ok")) == (True, "ok")
+    pool.release(CHASSIS)
+    assert pool.run(CHASSIS, lambda c: (True, "ok")) == (True, "ok")
+
+
+def test_reaper_closes_idle_connections(make_pool):
+    pool = make_pool(idle_timeout_sec=0.1)
+    pool.run(CHASSIS, lambda c: (True, "ok"))
+    deadline = time.monotonic() + 5
+    while not pool.connected[0].closed and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert pool.connected[0].closed
+    assert not any(pool._idle.values())
+
+
+@pytest.fixture
+def broker(monkeypatch, tmp_path):
+    """A real broker process; workers reach it through the environment, as under uvicorn."""
+    monkeypatch.setenv(ssh_broker.BROKER_ADDRESS_ENV, "")
+    monkeypatch.setenv(ssh_broker.BROKER_AUTHKEY_ENV, "")
+    settings = {
+        "workers": 2,
+        "broker_socket": str(tmp_path / "broker.sock"),
+        "max_sessions_per_chassis": 1,
+        "idle_timeout_sec": 300,
+        "session_wait_sec": 1.0,
+    }
+    proc = ssh_broker.start_broker_process(settings)
+    yield
+    conn = getattr(ssh_broker._local, "conn", None)
+    if conn is not None:
+        conn.close()
+        ssh_broker._local.conn = None
+    proc.terminate()
+    proc.join(5)
+
+
+@pytest.fixture
+def unreachable():
+    # A local port nothing listens on: connections are refused right away
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    return {"id": "lab", "host": "127.0.0.1", "port": port, "username": "u", "password": "p"}
+
+
+def test_config_generation_round_trip(broker, unreachable):
+    assert config_generation(unreachable) == 0
+    ok, _ = run_cli_stdin_on_ptx("cli", "show version\n", unreachable, timeout_sec=5)
+    # Counted even though it failed: the device may have applied part of the change
+    assert not ok and config_generation(unreachable) == 1
+    assert config_generation(dict(unreachable, host="127.0.0.2")) == 0
+
+
+def test_device_session_counts_against_chassis_limit(broker, unreachable):
+    with device_session(unreachable):
+        ok, out = run_cli_command_on_ptx("show version", unreachable, timeout_sec=5)
+        assert not ok and "busy" in out
+        # A worker connection that goes away returns its slots
+        ssh_broker._local.conn.close()
+        ssh_broker._local.conn = None
+        ok, out = run_cli_command_on_ptx("show version", unreachable, timeout_sec=5)
+        assert not ok and "busy" not in out
+    ok, out = run_cli_command_on_ptx("show version", unreachable, timeout_sec=5)
+    assert not ok and "busy" not in out
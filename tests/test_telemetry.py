@@ -0,0 +1,110 @@
+import time
+
+import pytest
+
+from tools.telemetry_poller import make_regex_parser, parse_alarms, parse_interface_rates, parse_routing_engine
+from tools.telemetry_store import ROLLUP_SEC, TelemetryStore
+
+ROUTING_ENGINE = """\
+Routing Engine status:
+  Slot 0:
+    Current state                  Master
+    Temperature                 41 degrees C / 105 degrees F
+    CPU temperature             52 degrees C / 125 degrees F
+    Memory utilization          23 percent
+    5 sec CPU utilization:
+      User                       3 percent
+      Background                 0 percent
+      Kernel                     5 percent
+      Idle                      91 percent
+    Model                          RE-PTX-2X00x4
+  Slot 1:
+    Current state                  Backup
+    Memory utilization          19 percent
+"""
+
+ALARMS = """\
+2 alarms currently active
+Alarm time               Class  Description
+2026-02-05 01:09:00 UTC  Major  FPC 3 Major Errors
+2026-02-05 01:10:12 UTC  Minor  Loss of communication with Backup RE (Major impact)
+"""
+
+INTERFACES = """\
+Physical interface: et-0/0/0, Enabled, Physical link is Up
+  Input rate     : 1200 bps (2 pps)
+  Output rate    : 3400 bps (5 pps)
+Physical interface: et-0/0/1, Enabled, Physical link is Down
+  Input rate     : 0 bps (0 pps)
+  Output rate    : 0 bps (0 pps)
+"""
+
+
+def test_parse_routing_engine():
+    samples = dict(parse_routing_engine(ROUTING_ENGINE))
+    assert samples == {
+        "re0.temperature_c": 41.0,
+        "re0.cpu_temperature_c": 52.0,
+        "re0.memory_utilization_pct": 23.0,
+        "re0.5_sec_cpu_user_pct": 3.0,
+        "re0.5_sec_cpu_background_pct": 0.0,
+        "re0.5_sec_cpu_kernel_pct": 5.0,
+        "re0.5_sec_cpu_idle_pct": 91.0,
+        "re1.memory_utilization_pct": 19.0,
+    }
+
+
+def test_parse_alarms_counts_class_column_only():
+    assert parse_alarms(ALARMS) == [("alarms.active", 2.0), ("alarms.major", 1.0), ("alarms.minor", 1.0)]
+    assert parse_alarms("No alarms currently active") == [
+        ("alarms.active", 0.0),
+        ("alarms.major", 0.0),
+        ("alarms.minor", 0.0),
+    ]
+    assert parse_alarms("error: syntax error") == []
+
+
+def test_parse_interface_rates():
+    samples = dict(parse_interface_rates(INTERFACES))
+    assert samples["interface.et-0/0/0.input_bps"] == 1200.0
+    assert samples["interface.et-0/0/0.output_pps"] == 5.0
+    assert samples["interface.et-0/0/1.input_bps"] == 0.0
+    assert len(samples) == 8
+
+
+def test_regex_parser_skips_non_matching_and_non_numeric():
+    parse = make_regex_parser({"bgp.peers_up": r"Peers:\s+(\d+)", "bgp.missing": r"Nope (\d+)", "bad": r"(x)"})
+    assert parse("Groups: 2 Peers: 14 Down peers: 0\nx") == [("bgp.peers_up", 14.0)]
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = TelemetryStore(tmp_path / "telemetry.db", retention_sec=3600, rollup_retention_sec=86400)
+    yield s
+    s.close()
+
+
+def test_store_latest_and_raw_series(store):
+    now = time.time()
+    store.append("ch0", [("re0.cpu_idle_pct", 90), ("alarms.active", 0)], ts=now - 120)
+    store.append("ch0", [("re0.cpu_idle_pct", 70)], ts=now - 60)
+    store.append("ch1", [("re0.cpu_idle_pct", 10)], ts=now - 60)
+    assert store.latest("ch0") == [("alarms.active", now - 120, 0.0), ("re0.cpu_idle_pct", now - 60, 70.0)]
+    assert [m for m, _, _ in store.latest("ch0", "re0.*")] == ["re0.cpu_idle_pct"]
+    series = store.series("ch0", "re0.*", since=now - 600)
+    assert [v for _, v, _, _ in series["re0.cpu_idle_pct"]] == [90.0, 70.0]
+
+
+def test_store_glob_does_not_treat_underscore_as_wildcard(store):
+    store.append("ch0", [("re0.cpu_idle_pct", 1), ("re0.cpuXidle_pct", 2)])
+    assert [m for m, _, _ in store.latest("ch0", "re0.cpu_idle*")] == ["re0.cpu_idle_pct"]
+
+
+def test_store_rollups_outlive_raw_samples(store):
+    now = time.time()
+    old = (int(now // ROLLUP_SEC) - 24) * ROLLUP_SEC  # two hours ago, bucket-aligned
+    store.append("ch0", [("m", 10)], ts=old + 1)
+    store.append("ch0", [("m", 30)], ts=old + 2)
+    store.prune(now)
+    assert store.series("ch0", "m", since=now - 600) == {}
+    assert store.series("ch0", "m", since=now - 3 * 3600) == {"m": [(old, 20.0, 10.0, 30.0)]}
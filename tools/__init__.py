@@ -12,6 +12,10 @@ _registry = {
     "add_software": ("tools.add_software", "register"),
     "read_var_log_messages_window": ("tools.read_var_log_messages_window", "register"),
     "list_chassis": ("tools.list_chassis", "register"),
+    "query_telemetry": ("tools.query_telemetry", "register"),
+    "follow_log": ("tools.follow_log", "register"),
+    "unfollow_log": ("tools.unfollow_log", "register"),
+    "chassis_resources": ("tools.chassis_resources", "register"),
 }
 
 
@@ -1,33 +1,85 @@
 """MCP tool: add/install software package on the PTX via SSH (request system software add)."""
-from tools.chassis_manager import get_chassis
-from tools.common import run_cli_command_on_ptx
+import asyncio
+from typing import Any, Dict
+
+from tools.chassis_manager import get_chassis, get_chassis_selection
+from tools.common import run_cli_command_on_ptx, run_for_each_chassis
+from tools.software_staging import local_sha256, resolve_local_image, stage_image, staging_settings
 
 logger = __import__("logging").getLogger("ptx-mcp-server")
 
 
-async def add_software(package_name: str, force: bool = False, chassis_id: str | None = None) -> str:
+def _install_cmd(package: str, force: bool) -> str:
+    cmd = "request system software add"
+    if force:
+        cmd += " force"
+    return cmd + f" {package}"
+
+
+async def add_software(
+    package_name: str = "",
+    force: bool = False,
+    chassis_id: str | None = None,
+    local_image: str | None = None,
+    selector: str | None = None,
+) -> str:
     """
     Add (install) a software package on a PTX chassis via SSH.
     Runs 'request system software add' with the given package path or URL.
 
+    With local_image, the image is first staged from the server's image directory to /var/tmp on
+    each chassis over SFTP (parallel, resumable, checksum-verified; chassis that already have it
+    are skipped) and then installed from there.
+
     Args:
-        package_name: Path or URL to the package (e.g. /var/tmp/junos-install.tgz or http://...).
+        package_name: Path or URL to the package on/reachable from the device (e.g. /var/tmp/junos-install.tgz or http://...). Not needed with local_image.
         force: If true, add 'force' option to overwrite existing. Defaults to False.
         chassis_id: ID of the target chassis from config/chassis.yml (e.g. "ch0"). If omitted and only one chassis is configured, it is used automatically.
+        local_image: Optional filename of an image in the server's image directory (software_staging.image_dir in config/tools.yml) to stage before installing.
+        selector: Optional chassis selector (e.g. "role=core,site=ams*"); stages/installs on every match in parallel instead of chassis_id.
     """
     try:
         package_name = (package_name or "").strip()
-        if not package_name:
-            return "Error: package_name must be non-empty."
-        chassis = get_chassis(chassis_id)
-        cmd = "request system software add"
-        if force:
-            cmd += " force"
-        cmd += f" {package_name}"
-        ok, out = run_cli_command_on_ptx(cmd, chassis, timeout_sec=600)
-        if not ok:
-            return f"Error:\n{out}"
-        return out
+        if not package_name and not local_image:
+            return "Error: package_name or local_image must be non-empty."
+        targets = get_chassis_selection(selector) if selector else [get_chassis(chassis_id)]
+
+        if local_image:
+            settings = staging_settings()
+            image = resolve_local_image(local_image, settings["image_dir"])
+            # Hash once up front (off the event loop: images are GBs); workers reuse the cached digest
+            await asyncio.to_thread(local_sha256, image)
+
+            def _stage_and_install(chassis: Dict[str, Any]) -> tuple[bool, str]:
+                staged = stage_image(
+                    chassis,
+                    image,
+                    remote_dir=settings["remote_dir"],
+                    chunk_size=settings["chunk_size"],
+                    retries=settings["retries"],
+                )
+                if not staged.ok:
+                    return False, f"Staging {image.name}: {staged.summary()}"
+                ok, out = run_cli_command_on_ptx(_install_cmd(staged.remote_path, force), chassis, timeout_sec=600)
+                return ok, f"Staging {image.name}: {staged.summary()}\n{out}"
+
+            # Transfers and installs take minutes: run them off the event loop
+            results = await asyncio.to_thread(
+                run_for_each_chassis, _stage_and_install, targets, max_workers=settings["max_parallel"]
+            )
+        else:
+            results = await asyncio.to_thread(
+                run_for_each_chassis,
+                lambda c: run_cli_command_on_ptx(_install_cmd(package_name, force), c, timeout_sec=600),
+                targets,
+            )
+
+        if not selector:
+            ok, out = results[0]
+            return out if ok else f"Error:\n{out}"
+        return "\n\n".join(
+            f"=== {c['id']} ===\n" + (out if ok else f"Error:\n{out}") for c, (ok, out) in zip(targets, results)
+        )
     except Exception as e:
         logger.error("add_software: %s", e)
         return f"Error: {str(e)}"
@@ -1,4 +1,12 @@
-"""Load and manage multi-chassis configuration from config/chassis.yml."""
+"""Load and manage multi-chassis configuration from config/chassis.yml.
+
+Chassis can belong to groups (per-group default credentials/settings and tags) and carry
+tags such as site, role and platform. The parsed inventory is cached until chassis.yml
+changes and keeps secondary indexes (group, tag values) so selectors like
+'role=core,site=ams*' resolve to chassis IDs without scanning every entry.
+"""
+import fnmatch
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any
 
@@ -10,31 +18,149 @@ _TOOLS_DIR = Path(__file__).resolve().parent
 _PROJECT_ROOT = _TOOLS_DIR.parent
 _DEFAULT_CHASSIS_PATH = _PROJECT_ROOT / "config" / "chassis.yml"
 
+# Max chassis a selector may fan out to in a single tool call
+MAX_SELECTION = 50
 
-def _load_chassis_file() -> dict[str, dict[str, Any]]:
-    """Load chassis definitions from config/chassis.yml. Returns {id: {host, ...}}."""
-    p = _DEFAULT_CHASSIS_PATH
-    if not p.is_file():
+# Connection settings a group may provide as defaults for its members
+_CONNECTION_KEYS = ("username", "password", "port", "ssh_key", "cli_invoke", "transport")
+
+
+@dataclass
+class Inventory:
+    """Parsed chassis.yml with secondary indexes for selection."""
+
+    chassis: dict[str, dict[str, Any]] = field(default_factory=dict)
+    # group name -> chassis IDs
+    by_group: dict[str, set[str]] = field(default_factory=dict)
+    # tag key -> tag value -> chassis IDs
+    by_tag: dict[str, dict[str, set[str]]] = field(default_factory=dict)
+
+
+_inventory: Inventory | None = None
+_inventory_mtime: float | None = None
+
+
+def _as_list(value: Any) -> list[str]:
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple)):
+        return [str(v) for v in value]
+    return [str(value)]
+
+
+def _as_tags(value: Any, where: str) -> dict[str, str]:
+    if value is None:
         return {}
-    with p.open() as f:
-        data = yaml.safe_load(f) or {}
+    if not isinstance(value, dict):
+        logger.warning("Ignoring tags of %s: expected a mapping", where)
+        return {}
+    return {str(k): str(v) for k, v in value.items() if v is not None}
+
+
+def _normalize_transport(raw: dict[str, Any], name: str) -> dict[str, Any]:
+    """Normalize an SSH transport profile (see transport_profiles in chassis.yml.example)."""
+    def _int(key: str) -> int | None:
+        return int(raw[key]) if raw.get(key) else None
+
+    known_hosts = raw.get("known_hosts")
+    if known_hosts and not Path(str(known_hosts)).is_absolute():
+        known_hosts = _PROJECT_ROOT / str(known_hosts)
+    return {
+        "name": name,
+        "compress": bool(raw.get("compress", False)),
+        "window_size": _int("window_size"),
+        "max_packet_size": _int("max_packet_size"),
+        "ciphers": _as_list(raw.get("ciphers")) or None,
+        "kex": _as_list(raw.get("kex")) or None,
+        "macs": _as_list(raw.get("macs")) or None,
+        "known_hosts": str(known_hosts) if known_hosts else None,
+    }
+
+
+def _resolve_transport(value: Any, profiles: dict[str, dict[str, Any]], cid: str) -> dict[str, Any] | None:
+    if value is None:
+        value = "default" if "default" in profiles else None
+    if value is None:
+        return None
+    if isinstance(value, dict):
+        return _normalize_transport(value, "(inline)")
+    profile = profiles.get(str(value))
+    if profile is None:
+        logger.warning("Chassis %r: unknown transport profile %r", cid, value)
+    return profile
+
+
+def _build_inventory(data: dict[str, Any]) -> Inventory:
+    raw_profiles = data.get("transport_profiles")
+    profiles = {
+        str(name): _normalize_transport(prof, str(name))
+        for name, prof in (raw_profiles.items() if isinstance(raw_profiles, dict) else [])
+        if isinstance(prof, dict)
+    }
+    raw_groups = data.get("groups")
+    groups: dict[str, dict[str, Any]] = raw_groups if isinstance(raw_groups, dict) else {}
     raw = data.get("chassis")
+    inv = Inventory()
     if not isinstance(raw, dict) or not raw:
-        return {}
-    result: dict[str, dict[str, Any]] = {}
+        return inv
     for cid, info in raw.items():
         if not isinstance(info, dict) or not info.get("host"):
             logger.warning("Skipping chassis %r: missing 'host'", cid)
             continue
-        result[str(cid)] = {
+        cid = str(cid)
+        member_of = _as_list(info.get("groups")) + _as_list(info.get("group"))
+        # Group defaults apply in listed order; chassis fields win over all groups
+        merged: dict[str, Any] = {}
+        tags: dict[str, str] = {}
+        for gname in member_of:
+            group = groups.get(gname)
+            if not isinstance(group, dict):
+                logger.warning("Chassis %r: unknown group %r", cid, gname)
+                continue
+            merged.update({k: group[k] for k in _CONNECTION_KEYS if group.get(k) is not None})
+            tags.update(_as_tags(group.get("tags"), f"group {gname!r}"))
+        merged.update({k: info[k] for k in _CONNECTION_KEYS if info.get(k) is not None})
+        tags.update(_as_tags(info.get("tags"), f"chassis {cid!r}"))
+        inv.chassis[cid] = {
+            "id": cid,
             "host": str(info["host"]),
-            "username": str(info.get("username", "")),
-            "password": str(info.get("password", "")),
-            "port": int(info.get("port", 22)),
-            "ssh_key": str(info["ssh_key"]) if info.get("ssh_key") else None,
-            "cli_invoke": str(info["cli_invoke"]).strip().lower() if info.get("cli_invoke") else None,
+            "username": str(merged.get("username", "")),
+            "password": str(merged.get("password", "")),
+            "port": int(merged.get("port", 22)),
+            "ssh_key": str(merged["ssh_key"]) if merged.get("ssh_key") else None,
+            "cli_invoke": str(merged["cli_invoke"]).strip().lower() if merged.get("cli_invoke") else None,
+            "groups": member_of,
+            "tags": tags,
+            "transport": _resolve_transport(merged.get("transport"), profiles, cid),
         }
-    return result
+        for gname in member_of:
+            inv.by_group.setdefault(gname, set()).add(cid)
+        for key, value in tags.items():
+            inv.by_tag.setdefault(key, {}).setdefault(value, set()).add(cid)
+    return inv
+
+
+def load_inventory() -> Inventory:
+    """Return the parsed inventory, re-reading config/chassis.yml only when it changes."""
+    global _inventory, _inventory_mtime
+    p = _DEFAULT_CHASSIS_PATH
+    try:
+        mtime = p.stat().st_mtime
+    except OSError:
+        _inventory, _inventory_mtime = Inventory(), None
+        return _inventory
+    if _inventory is not None and mtime == _inventory_mtime:
+        return _inventory
+    with p.open() as f:
+        data = yaml.safe_load(f) or {}
+    _inventory = _build_inventory(data if isinstance(data, dict) else {})
+    _inventory_mtime = mtime
+    return _inventory
+
+
+def _load_chassis_file() -> dict[str, dict[str, Any]]:
+    """Load chassis definitions from config/chassis.yml. Returns {id: {host, ...}}."""
+    return load_inventory().chassis
 
 
 def load_chassis_config() -> dict[str, dict[str, Any]]:
@@ -42,10 +168,60 @@ def load_chassis_config() -> dict[str, dict[str, Any]]:
     return _load_chassis_file()
 
 
+def _match_values(index: dict[str, set[str]], patterns: list[str]) -> set[str]:
+    """Union of IDs whose indexed value matches any pattern (exact values hit the index directly)."""
+    out: set[str] = set()
+    for pat in patterns:
+        if any(c in pat for c in "*?["):
+            for value, ids in index.items():
+                if fnmatch.fnmatchcase(value, pat):
+                    out |= ids
+        else:
+            out |= index.get(pat, set())
+    return out
+
+
+def select_chassis(selector: str | None) -> list[str]:
+    """Resolve a selector to sorted chassis IDs.
+
+    Selector syntax: comma-separated terms, all of which must match (AND). Each term is
+    'key=pattern' where key is a tag (site, role, platform, ...) or one of id/group/host;
+    a bare 'pattern' matches the chassis ID. Patterns are shell-style globs and may list
+    alternatives with '|', e.g. 'role=core,site=ams*|fra*'. Empty selector selects all.
+    """
+    inv = load_inventory()
+    result: set[str] | None = None
+    for term in (selector or "").split(","):
+        term = term.strip()
+        if not term:
+            continue
+        key, sep, pattern = term.partition("=")
+        if not sep:
+            key, pattern = "id", term
+        key = key.strip()
+        patterns = [p.strip() for p in pattern.split("|") if p.strip()]
+        if key == "id":
+            ids = {p for p in patterns if p in inv.chassis}
+            for pat in patterns:
+                if any(c in pat for c in "*?["):
+                    ids |= {cid for cid in inv.chassis if fnmatch.fnmatchcase(cid, pat)}
+        elif key == "group":
+            ids = _match_values(inv.by_group, patterns)
+        elif key == "host":
+            ids = {cid for cid, c in inv.chassis.items() if any(fnmatch.fnmatchcase(c["host"], p) for p in patterns)}
+        else:
+            ids = _match_values(inv.by_tag.get(key, {}), patterns)
+        result = ids if result is None else result & ids
+        if not result:
+            return []
+    return sorted(inv.chassis if result is None else result)
+
+
 def get_chassis(chassis_id: str | None = None) -> dict[str, Any]:
     """Resolve a chassis by ID. If chassis_id is None and only one exists, use it.
 
-    Returns dict with keys: host, username, password, port, ssh_key, cli_invoke.
+    chassis_id may also be a selector (see select_chassis) that matches exactly one chassis.
+    Returns dict with keys: id, host, username, password, port, ssh_key, cli_invoke, groups, tags, transport.
     Raises ValueError if chassis not found or ambiguous.
     """
     all_chassis = load_chassis_config()
@@ -55,30 +231,58 @@ def get_chassis(chassis_id: str | None = None) -> dict[str, Any]:
         )
     if chassis_id is not None:
         chassis = all_chassis.get(chassis_id)
+        if chassis is None and any(c in chassis_id for c in "=*?[,|"):
+            ids = select_chassis(chassis_id)
+            if len(ids) == 1:
+                return all_chassis[ids[0]]
+            if ids:
+                raise ValueError(
+                    f"Selector '{chassis_id}' matches {len(ids)} chassis; it must match exactly one."
+                )
         if chassis is None:
-            available = ", ".join(sorted(all_chassis.keys()))
+            available = ", ".join(sorted(all_chassis.keys())[:20])
+            more = f" (+{len(all_chassis) - 20} more; use list_chassis)" if len(all_chassis) > 20 else ""
             raise ValueError(
-                f"Unknown chassis_id '{chassis_id}'. Available: {available}"
+                f"Unknown chassis_id '{chassis_id}'. Available: {available}{more}"
             )
         return chassis
     # chassis_id is None — auto-select if only one
     if len(all_chassis) == 1:
         return next(iter(all_chassis.values()))
-    available = ", ".join(sorted(all_chassis.keys()))
+    available = ", ".join(sorted(all_chassis.keys())[:20])
     raise ValueError(
-        f"Multiple chassis configured ({available}). "
+        f"Multiple chassis configured ({available}{', ...' if len(all_chassis) > 20 else ''}). "
         f"Please specify chassis_id."
     )
 
 
-def list_all_chassis() -> dict[str, dict[str, Any]]:
-    """Return all chassis with safe info (no passwords/keys)."""
+def get_chassis_selection(selector: str, max_chassis: int = MAX_SELECTION) -> list[dict[str, Any]]:
+    """Resolve a selector to chassis dicts for fan-out tools.
+
+    Raises ValueError if nothing matches or more than max_chassis match.
+    """
+    ids = select_chassis(selector)
+    if not ids:
+        raise ValueError(f"No chassis match selector '{selector}'.")
+    if len(ids) > max_chassis:
+        raise ValueError(
+            f"Selector '{selector}' matches {len(ids)} chassis (limit {max_chassis}); narrow it down."
+        )
+    all_chassis = load_chassis_config()
+    return [all_chassis[cid] for cid in ids]
+
+
+def list_all_chassis(selector: str | None = None) -> dict[str, dict[str, Any]]:
+    """Return chassis matching selector (all by default) with safe info (no passwords/keys)."""
     all_chassis = load_chassis_config()
     safe: dict[str, dict[str, Any]] = {}
-    for cid, info in all_chassis.items():
+    for cid in select_chassis(selector):
+        info = all_chassis[cid]
         safe[cid] = {
             "host": info["host"],
             "port": info["port"],
             "username": info["username"],
+            "groups": info["groups"],
+            "tags": info["tags"],
         }
     return safe
@@ -0,0 +1,48 @@
+"""MCP resources: ptx://<chassis_id>/facts and ptx://<chassis_id>/config, with subscriptions."""
+import asyncio
+
+from tools.chassis_state import read_config, read_facts, subscribe, unsubscribe
+
+logger = __import__("logging").getLogger("ptx-mcp-server")
+
+
+async def chassis_facts(chassis_id: str) -> str:
+    """Device facts (show version, show system information), served from the server-side cache."""
+    return await asyncio.to_thread(read_facts, chassis_id)
+
+
+async def chassis_config(chassis_id: str) -> str:
+    """Full configuration (show configuration), served from the server-side cache."""
+    return await asyncio.to_thread(read_config, chassis_id)
+
+
+def register(mcp):
+    """Register the resource templates and resources/subscribe handlers with the FastMCP server."""
+    mcp.resource("ptx://{chassis_id}/facts", name="chassis_facts", mime_type="text/plain")(chassis_facts)
+    mcp.resource("ptx://{chassis_id}/config", name="chassis_config", mime_type="text/plain")(chassis_config)
+
+    if mcp.settings.stateless_http:
+        # Multi-process mode: no session outlives a request, so updates could not be delivered
+        logger.warning("chassis_resources: stateless HTTP (server.workers > 1), resource subscriptions disabled")
+        return
+
+    server = mcp._mcp_server
+
+    @server.subscribe_resource()
+    async def _subscribe(uri) -> None:
+        subscribe(str(uri), server.request_context.session)
+
+    @server.unsubscribe_resource()
+    async def _unsubscribe(uri) -> None:
+        unsubscribe(str(uri), server.request_context.session)
+
+    # The SDK always advertises resources.subscribe=false; we do handle subscriptions
+    get_capabilities = server.get_capabilities
+
+    def _get_capabilities(*args, **kwargs):
+        caps = get_capabilities(*args, **kwargs)
+        if caps.resources is not None:
+            caps.resources.subscribe = True
+        return caps
+
+    server.get_capabilities = _get_capabilities
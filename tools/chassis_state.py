@@ -0,0 +1,221 @@
+"""
+Server-side cache of chassis facts/config behind the ptx://<chassis_id>/{facts,config}
+resources, plus change notifications for subscribed clients.
+
+Cached values stay valid until a change is detected: commits made through this server
+(edit_configuration, rollback_configuration) notify immediately, and while any client is
+subscribed a watcher polls one cheap fingerprint per chassis ('show system commit' for
+config, 'show version' for software) and sends resources/updated only when it changes.
+Entries cached before the watcher took its first fingerprint of a chassis are dropped
+at that point, and subscriptions are removed when the client session ends.
+"""
+import asyncio
+import hashlib
+import re
+import time
+from typing import Any, Dict
+
+from pydantic import AnyUrl
+
+from tools.chassis_manager import get_chassis
+from tools.common import on_session_closed, run_cli_command_on_ptx, run_for_each_chassis
+from tools.config_loader import load_config
+from tools.config_tree import cache_ttl_sec, get_snapshot, invalidate_snapshot, store_snapshot
+from tools.ssh_broker import config_generation
+
+logger = __import__("logging").getLogger("ptx-mcp-server")
+
+DEFAULT_WATCH_INTERVAL_SEC = 60
+
+_URI_RE = re.compile(r"^ptx://(?P<cid>[^/]+)/(?P<kind>facts|config)$")
+# First commit history entry, e.g. '0   2026-02-05 01:09:00 UTC by admin via cli'
+_COMMIT_ENTRY_RE = re.compile(r"^\s*0\s+\S.*$", re.M)
+
+# chassis_id -> (facts text, fetched_at, SSH broker config generation); config text lives
+# in the config_tree snapshot
+_facts: dict[str, tuple[str, float, int]] = {}
+# resource URI -> subscribed client sessions
+_subscribers: dict[str, set[Any]] = {}
+# (chassis_id, 'commit' | 'version') -> last seen fingerprint
+_fingerprints: dict[tuple[str, str], str] = {}
+_watcher: asyncio.Task | None = None
+
+
+def resource_uri(chassis_id: str, kind: str) -> str:
+    return f"ptx://{chassis_id}/{kind}"
+
+
+def _is_watched(chassis_id: str, kind: str) -> bool:
+    # Only once the watcher has a baseline for the chassis; until then changes go unnoticed
+    return (
+        bool(_subscribers.get(resource_uri(chassis_id, kind)))
+        and _watcher is not None
+        and (chassis_id, "commit") in _fingerprints
+    )
+
+
+def _ttl(chassis_id: str, kind: str) -> float:
+    # While watched, cached data is valid until the watcher reports a change
+    return float("inf") if _is_watched(chassis_id, kind) else cache_ttl_sec()
+
+
+def read_facts(chassis_id: str) -> str:
+    """Return cached facts for chassis_id, collecting them over SSH on a miss."""
+    from tools.get_facts import _collect_facts
+
+    chassis = get_chassis(chassis_id)
+    # Keyed by the resolved ID: chassis_id may be a selector matching one chassis
+    cid = chassis["id"]
+    generation = config_generation(chassis)
+    cached = _facts.get(cid)
+    # Another worker process may have committed since (multi-process mode)
+    if cached is not None and cached[2] == generation:
+        if time.monotonic() - cached[1] <= _ttl(cid, "facts"):
+            return cached[0]
+    text = _collect_facts(chassis)
+    _facts[cid] = (text, time.monotonic(), generation)
+    return text
+
+
+def read_config(chassis_id: str) -> str:
+    """Return the cached full configuration for chassis_id, fetching it over SSH on a miss."""
+    chassis = get_chassis(chassis_id)
+    snap = get_snapshot(chassis, ttl_sec=_ttl(chassis["id"], "config"))
+    if snap is None:
+        ok, out = run_cli_command_on_ptx("show configuration", chassis, timeout_sec=120)
+        if not ok:
+            raise RuntimeError(out)
+        snap = store_snapshot(chassis, out)
+    return snap.text
+
+
+async def notify_chassis_changed(chassis: Dict[str, Any], config: bool = True, facts: bool = False) -> None:
+    """Drop cached facts/config for chassis and send resources/updated to subscribers."""
+    cid = chassis.get("id")
+    kinds = []
+    if config:
+        invalidate_snapshot(chassis)
+        kinds.append("config")
+    if facts and cid:
+        _facts.pop(cid, None)
+        kinds.append("facts")
+    if not cid:
+        return
+    # Re-baseline the watcher so our own change is not reported twice
+    _fingerprints.pop((cid, "commit"), None)
+    _fingerprints.pop((cid, "version"), None)
+    for kind in kinds:
+        uri = resource_uri(cid, kind)
+        for session in list(_subscribers.get(uri, ())):
+            try:
+                await session.send_resource_updated(AnyUrl(uri))
+            except Exception as e:
+                logger.info("resources: dropping subscriber of %s: %s", uri, e)
+                _subscribers[uri].discard(session)
+
+
+def subscribe(uri: str, session: Any) -> None:
+    m = _URI_RE.match(uri)
+    if not m:
+        raise ValueError(f"Unknown resource '{uri}'. Use ptx://<chassis_id>/facts or ptx://<chassis_id>/config.")
+    chassis = get_chassis(m.group("cid"))
+    if chassis["id"] != m.group("cid"):
+        # Updates are sent for ptx://<chassis_id>/..., which the client would not recognize
+        raise ValueError(f"Subscribe to {resource_uri(chassis['id'], m.group('kind'))} (a chassis ID, not a selector).")
+    _subscribers.setdefault(uri, set()).add(session)
+    on_session_closed(session, _session_closed)
+    _ensure_watcher()
+
+
+def unsubscribe(uri: str, session: Any) -> None:
+    subs = _subscribers.get(uri)
+    if subs is not None:
+        subs.discard(session)
+        if not subs:
+            del _subscribers[uri]
+
+
+def _session_closed(session: Any) -> None:
+    """Drop every subscription of a client session that went away without unsubscribing."""
+    for uri in list(_subscribers):
+        unsubscribe(uri, session)
+
+
+def _watch_interval_sec() -> float:
+    try:
+        raw = load_config().get("resources") or {}
+        return max(5.0, float(raw.get("watch_interval_sec", DEFAULT_WATCH_INTERVAL_SEC)))
+    except (FileNotFoundError, TypeError, ValueError):
+        return float(DEFAULT_WATCH_INTERVAL_SEC)
+
+
+def _probe(chassis: Dict[str, Any], kinds: set[str]) -> dict[str, str]:
+    """Fingerprint the device state behind the watched kinds (blocking; runs in a worker thread)."""
+    out: dict[str, str] = {}
+    # A commit can change both config and facts (e.g. host-name)
+    ok, text = run_cli_command_on_ptx("show system commit", chassis, timeout_sec=60)
+    if ok:
+        m = _COMMIT_ENTRY_RE.search(text)
+        out["commit"] = hashlib.sha1((m.group(0) if m else text).encode()).hexdigest()
+    if "facts" in kinds:
+        ok, text = run_cli_command_on_ptx("show version", chassis, timeout_sec=60)
+        if ok:
+            out["version"] = hashlib.sha1(text.encode()).hexdigest()
+    return out
+
+
+async def _check_once() -> bool:
+    """Probe every watched chassis once and notify on changes. Returns False when nothing is watched."""
+    watched: dict[str, set[str]] = {}
+    for uri, sessions in _subscribers.items():
+        m = _URI_RE.match(uri)
+        if m and sessions:
+            watched.setdefault(m.group("cid"), set()).add(m.group("kind"))
+    if not watched:
+        return False
+    targets = []
+    for cid in watched:
+        try:
+            targets.append(get_chassis(cid))
+        except ValueError:
+            continue  # removed from chassis.yml
+    results = await asyncio.to_thread(run_for_each_chassis, lambda c: _probe(c, watched[c["id"]]), targets)
+    for chassis, prints in zip(targets, results):
+        cid = chassis["id"]
+        if prints and (cid, "commit") not in _fingerprints:
+            # First baseline: anything cached before it may already be stale
+            _facts.pop(cid, None)
+            invalidate_snapshot(chassis)
+        changed = set()
+        for key, value in prints.items():
+            previous = _fingerprints.get((cid, key))
+            if previous is not None and previous != value:
+                changed.add(key)
+        if changed:
+            logger.info("resources: %s changed on %s", ",".join(sorted(changed)), cid)
+            await notify_chassis_changed(chassis, config="commit" in changed, facts=True)
+        # Set after notifying: notify_chassis_changed clears the fingerprints of this chassis
+        for key, value in prints.items():
+            _fingerprints[(cid, key)] = value
+    return True
+
+
+async def _watch_loop() -> None:
+    global _watcher
+    try:
+        while True:
+            # First pass right away to take the baseline fingerprints
+            try:
+                if not await _check_once():
+                    return
+            except Exception as e:
+                logger.error("resources: watcher check failed: %s", e)
+            await asyncio.sleep(_watch_interval_sec())
+    finally:
+        _watcher = None
+
+
+def _ensure_watcher() -> None:
+    global _watcher
+    if _watcher is None or _watcher.done():
+        _watcher = asyncio.get_running_loop().create_task(_watch_loop())
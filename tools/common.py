@@ -4,15 +4,21 @@ Shared helpers for PTX MCP tools. SSH-only (no NETCONF/RPC).
 import logging
 import os
 import re
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Any, Dict, Tuple
+from typing import Any, Callable, Dict, List, Tuple, TypeVar
 
 import paramiko
 
+from tools import ssh_broker
+
 logger = logging.getLogger("ptx-mcp-server")
 
+_T = TypeVar("_T")
+
 # Box-drawing for visual tool-call logs (debug)
 _BOX_WIDTH = 72
 _B = "═" * _BOX_WIDTH
@@ -151,25 +157,209 @@ def _escape_single_quoted(s: str) -> str:
     return s.replace("'", "'\"'\"'")
 
 
-def run_cli_command_on_ptx(command: str, chassis: Dict[str, Any], timeout_sec: int = 90) -> Tuple[bool, str]:
+def wrap_cli_command(command: str, chassis: Dict[str, Any]) -> Tuple[str, str]:
+    """Wrap a Junos CLI command for exec over SSH per the chassis cli_invoke. Returns (wrapped, cli_invoke)."""
+    cli_invoke = chassis.get("cli_invoke") or ""
+    if cli_invoke == "cli-quoted":
+        return "cli '" + _escape_single_quoted(command) + "'", cli_invoke
+    return "cli " + command, "cli"
+
+
+# Parsed private keys by (path, mtime): avoids re-reading and re-parsing the key on every connect
+_pkeys: Dict[Tuple[str, float], paramiko.PKey] = {}
+# Host keys seen per known_hosts file (shared by all connections using that file)
+_host_keys: Dict[str, paramiko.HostKeys] = {}
+_host_keys_lock = threading.Lock()
+
+
+def _load_private_key(path: str) -> paramiko.PKey | None:
+    """Return the parsed key at path (cached until the file changes), or None if it cannot be parsed."""
+    try:
+        key = (path, os.stat(path).st_mtime)
+    except OSError:
+        return None
+    pkey = _pkeys.get(key)
+    if pkey is None:
+        try:
+            pkey = paramiko.PKey.from_path(path)
+        except Exception as e:
+            logger.warning("Cannot preload SSH key %s (%s); paramiko will load it per connect", path, e)
+            return None
+        _pkeys[key] = pkey
+    return pkey
+
+
+def _shared_host_keys(path: str) -> paramiko.HostKeys:
+    with _host_keys_lock:
+        hk = _host_keys.get(path)
+        if hk is None:
+            hk = paramiko.HostKeys()
+            if os.path.exists(path):
+                hk.load(path)
+            _host_keys[path] = hk
+        return hk
+
+
+class _CachingHostKeyPolicy(paramiko.MissingHostKeyPolicy):
+    """Accept unknown host keys (like AutoAddPolicy) and remember them in the shared known_hosts cache."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def missing_host_key(self, client, hostname, key):
+        hk = _shared_host_keys(self.path)
+        with _host_keys_lock:
+            hk.add(hostname, key.get_name(), key)
+            try:
+                with open(self.path, "a") as f:
+                    f.write(f"{hostname} {key.get_name()} {key.get_base64()}\n")
+            except OSError as e:
+                logger.warning("Cannot update known_hosts %s: %s", self.path, e)
+
+
+class _TunedTransport(paramiko.Transport):
+    """Transport that remembers the negotiated key exchange (paramiko drops it after kex).
+
+    paramiko has no public accessor for the agreed kex, so this hooks a private method
+    (requirements.txt bounds the paramiko version). Any mismatch only loses the log field.
+    """
+
+    negotiated_kex: str | None = None
+
+    def _parse_kex_init(self, m):
+        super()._parse_kex_init(m)
+        try:
+            engine = type(self.kex_engine)
+            # Several algorithm names can share one engine class; report our first preferred match
+            self.negotiated_kex = next(
+                (name for name in self.preferred_kex if self._kex_info.get(name) is engine), engine.__name__
+            )
+        except Exception:
+            self.negotiated_kex = None
+
+
+def _transport_factory(profile: Dict[str, Any]):
+    """Build a paramiko Transport factory applying window/packet sizes and algorithm preferences."""
+    def factory(sock, disabled_algorithms=None):
+        kwargs = {}
+        if profile.get("window_size"):
+            kwargs["default_window_size"] = profile["window_size"]
+        if profile.get("max_packet_size"):
+            kwargs["default_max_packet_size"] = profile["max_packet_size"]
+        t = _TunedTransport(sock, disabled_algorithms=disabled_algorithms, **kwargs)
+        opts = t.get_security_options()
+        for attr, key in (("ciphers", "ciphers"), ("kex", "kex"), ("digests", "macs")):
+            wanted = profile.get(key)
+            if not wanted:
+                continue
+            supported = getattr(opts, attr)
+            preferred = [a for a in wanted if a in supported]
+            if not preferred:
+                logger.warning("Transport profile %s: none of %s supported locally", profile.get("name"), wanted)
+                continue
+            # Preferred first, then the rest as fallback so negotiation cannot fail on our side
+            setattr(opts, attr, tuple(preferred) + tuple(a for a in supported if a not in preferred))
+        return t
+
+    return factory
+
+
+def open_ssh_client(chassis: Dict[str, Any], timeout_sec: int = 30) -> paramiko.SSHClient:
+    """Open an SSH connection to the chassis (key auth if ssh_key exists, else password). Caller closes it.
+
+    Applies the chassis transport profile (compression, window/packet sizes, cipher/kex/mac
+    preference, known_hosts cache) when one is configured.
+    """
+    host = chassis["host"]
+    port = chassis.get("port", 22)
+    username = chassis.get("username", "")
+    password = chassis.get("password", "")
+    ssh_key = chassis.get("ssh_key")
+    profile = chassis.get("transport") or {}
+    client = paramiko.SSHClient()
+    known_hosts = profile.get("known_hosts")
+    if known_hosts:
+        name = host if port == 22 else f"[{host}]:{port}"
+        entry = _shared_host_keys(known_hosts).lookup(name)
+        for key_type in entry.keys() if entry else ():
+            client.get_host_keys().add(name, key_type, entry[key_type])
+        client.set_missing_host_key_policy(_CachingHostKeyPolicy(known_hosts))
+    else:
+        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+    kwargs: Dict[str, Any] = {
+        "port": port,
+        "username": username,
+        "timeout": timeout_sec,
+        "compress": profile.get("compress", False),
+        "transport_factory": _transport_factory(profile),
+    }
+    if ssh_key and os.path.exists(ssh_key):
+        pkey = _load_private_key(ssh_key)
+        if pkey is not None:
+            kwargs["pkey"] = pkey
+        else:
+            kwargs["key_filename"] = ssh_key
+    else:
+        kwargs["password"] = password
+    try:
+        client.connect(host, **kwargs)
+    except Exception:
+        client.close()
+        raise
+    return client
+
+
+def negotiated_transport_params(client: paramiko.SSHClient) -> Dict[str, Any]:
+    """Return the negotiated cipher/kex/mac/compression and window/packet sizes of a connected client."""
+    t = client.get_transport()
+    if t is None:
+        return {}
+    return {
+        "cipher": t.local_cipher,
+        "kex": getattr(t, "negotiated_kex", None),
+        "mac": t.local_mac,
+        "compression": t.local_compression,
+        "host_key": t.host_key_type,
+        "window_size": t.default_window_size,
+        "max_packet": t.default_max_packet_size,
+    }
+
+
+def _read_timed(stdout) -> Tuple[bytes, float, int | None]:
+    """Read stdout to EOF. Returns (data, time of the first byte, first byte to EOF rate in bytes/s).
+
+    Time to first byte is the device producing output; first byte to EOF is the transfer. The
+    rate is None when there is nothing after the first byte to measure (e.g. empty output).
+    """
+    data = stdout.read(1)
+    first_byte = time.monotonic()
+    data += stdout.read()
+    transfer_sec = time.monotonic() - first_byte
+    rate = int((len(data) - 1) / transfer_sec) if len(data) > 1 and transfer_sec > 0 else None
+    return data, first_byte, rate
+
+
+def run_cli_command_on_ptx(
+    command: str, chassis: Dict[str, Any], timeout_sec: int = 90, client: paramiko.SSHClient | None = None
+) -> Tuple[bool, str]:
     """Run a single CLI command on the PTX via SSH. Returns (success, output).
 
     Args:
         command: CLI command to execute.
         chassis: Connection dict with keys: host, username, password, port, ssh_key, cli_invoke.
         timeout_sec: SSH command timeout in seconds.
+        client: Already connected client to reuse (left open). By default a new connection is
+            opened, or the call goes through the SSH broker in multi-process mode.
     """
+    if client is None:
+        routed = ssh_broker.dispatch("cli", command, chassis, timeout_sec)
+        if routed is not None:
+            return routed
     host = chassis["host"]
     port = chassis.get("port", 22)
     username = chassis.get("username", "")
-    password = chassis.get("password", "")
     ssh_key = chassis.get("ssh_key")
-    cli_invoke = chassis.get("cli_invoke") or ""
-    if cli_invoke == "cli-quoted":
-        wrapped = "cli '" + _escape_single_quoted(command) + "'"
-    else:
-        wrapped = "cli " + command
-        cli_invoke = "cli"
+    wrapped, cli_invoke = wrap_cli_command(command, chassis)
     auth = "key" if ssh_key and os.path.exists(ssh_key) else "password"
     _log_tool_call(
         "CLI SSH REQUEST",
@@ -182,18 +372,21 @@ def run_cli_command_on_ptx(command: str, chassis: Dict[str, Any], timeout_sec: i
         auth=auth,
         timeout_sec=timeout_sec,
     )
-    client = paramiko.SSHClient()
-    client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+    owned = client is None
+    channel = None
     start = time.monotonic()
     try:
-        if ssh_key and os.path.exists(ssh_key):
-            client.connect(host, port=port, username=username, key_filename=ssh_key, timeout=min(30, timeout_sec))
-        else:
-            client.connect(host, port=port, username=username, password=password, timeout=min(30, timeout_sec))
+        if owned:
+            client = open_ssh_client(chassis, timeout_sec=min(30, timeout_sec))
+        connect_ms = int((time.monotonic() - start) * 1000)
+        exec_start = time.monotonic()
         stdin, stdout, stderr = client.exec_command(wrapped, timeout=timeout_sec)
-        out = stdout.read().decode("utf-8", errors="replace")
-        err = stderr.read().decode("utf-8", errors="replace")
+        channel = stdout.channel
+        raw_out, first_byte, transfer_rate = _read_timed(stdout)
+        raw_err = stderr.read()
         code = stdout.channel.recv_exit_status()
+        out = raw_out.decode("utf-8", errors="replace")
+        err = raw_err.decode("utf-8", errors="replace")
         duration_ms = int((time.monotonic() - start) * 1000)
         out_preview = (out + "\n" + err).strip()[:500] if (out.strip() or err.strip()) else "(no output)"
         _log_tool_call(
@@ -201,8 +394,14 @@ def run_cli_command_on_ptx(command: str, chassis: Dict[str, Any], timeout_sec: i
             exit_code=code,
             success=code == 0,
             duration_ms=duration_ms,
+            connect_ms=connect_ms,
+            reused_connection=not owned,
             stdout_len=len(out),
             stderr_len=len(err),
+            first_byte_ms=int((first_byte - exec_start) * 1000),
+            transfer_bytes_per_sec=transfer_rate,
+            transport_profile=(chassis.get("transport") or {}).get("name"),
+            **negotiated_transport_params(client),
             output_preview=out_preview,
         )
         if err.strip():
@@ -219,10 +418,19 @@ def run_cli_command_on_ptx(command: str, chassis: Dict[str, Any], timeout_sec: i
         logger.error("CLI SSH: %s", e)
         return (False, str(e))
     finally:
-        client.close()
+        if channel is not None:
+            channel.close()
+        if owned and client is not None:
+            client.close()
 
 
-def run_cli_stdin_on_ptx(command: str, stdin_content: str, chassis: Dict[str, Any], timeout_sec: int = 120) -> Tuple[bool, str]:
+def run_cli_stdin_on_ptx(
+    command: str,
+    stdin_content: str,
+    chassis: Dict[str, Any],
+    timeout_sec: int = 120,
+    client: paramiko.SSHClient | None = None,
+) -> Tuple[bool, str]:
     """Run a CLI command on the PTX and feed stdin (e.g. 'cli' with multi-line input). Returns (success, output).
 
     Args:
@@ -230,30 +438,108 @@ def run_cli_stdin_on_ptx(command: str, stdin_content: str, chassis: Dict[str, An
         stdin_content: Content to feed on stdin.
         chassis: Connection dict with keys: host, username, password, port, ssh_key.
         timeout_sec: SSH command timeout in seconds.
+        client: Already connected client to reuse (left open); see run_cli_command_on_ptx.
     """
-    host = chassis["host"]
-    port = chassis.get("port", 22)
-    username = chassis.get("username", "")
-    password = chassis.get("password", "")
-    ssh_key = chassis.get("ssh_key")
-    client = paramiko.SSHClient()
-    client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+    if client is None:
+        routed = ssh_broker.dispatch("stdin", command, stdin_content, chassis, timeout_sec)
+        if routed is not None:
+            return routed
+    _log_tool_call(
+        "CLI SSH STDIN REQUEST",
+        command=command,
+        host=chassis["host"],
+        port=chassis.get("port", 22),
+        user=chassis.get("username", "") or "(empty)",
+        stdin_len=len(stdin_content),
+        timeout_sec=timeout_sec,
+    )
+    owned = client is None
+    channel = None
+    start = time.monotonic()
     try:
-        if ssh_key and os.path.exists(ssh_key):
-            client.connect(host, port=port, username=username, key_filename=ssh_key, timeout=min(30, timeout_sec))
-        else:
-            client.connect(host, port=port, username=username, password=password, timeout=min(30, timeout_sec))
+        if owned:
+            client = open_ssh_client(chassis, timeout_sec=min(30, timeout_sec))
+        connect_ms = int((time.monotonic() - start) * 1000)
         stdin, stdout, stderr = client.exec_command(command, timeout=timeout_sec)
+        channel = stdout.channel
         stdin.write(stdin_content)
         stdin.channel.shutdown_write()
-        out = stdout.read().decode("utf-8", errors="replace")
+        # Measured from the end of input: the device is loading/committing until its first byte
+        input_sent = time.monotonic()
+        raw_out, first_byte, transfer_rate = _read_timed(stdout)
+        out = raw_out.decode("utf-8", errors="replace")
         err = stderr.read().decode("utf-8", errors="replace")
         code = stdout.channel.recv_exit_status()
+        _log_tool_call(
+            "CLI SSH STDIN RESPONSE",
+            exit_code=code,
+            success=code == 0,
+            duration_ms=int((time.monotonic() - start) * 1000),
+            connect_ms=connect_ms,
+            reused_connection=not owned,
+            stdout_len=len(out),
+            stderr_len=len(err),
+            first_byte_ms=int((first_byte - input_sent) * 1000),
+            transfer_bytes_per_sec=transfer_rate,
+            transport_profile=(chassis.get("transport") or {}).get("name"),
+            **negotiated_transport_params(client),
+        )
         if err.strip():
             out = out + "\n" + err if out.strip() else err
         return (code == 0, out.strip() or "(no output)")
     except Exception as e:
+        _log_tool_call(
+            "CLI SSH STDIN EXCEPTION",
+            error=str(e),
+            error_type=type(e).__name__,
+            duration_ms=int((time.monotonic() - start) * 1000),
+        )
         logger.error("CLI SSH (stdin): %s", e)
         return (False, str(e))
     finally:
-        client.close()
+        if channel is not None:
+            channel.close()
+        if owned and client is not None:
+            client.close()
+
+
+# client session -> callbacks to run when it ends (each session's teardown is hooked once)
+_session_close_callbacks: dict[Any, list[Callable[[Any], None]]] = {}
+
+
+def on_session_closed(session: Any, callback: Callable[[Any], None]) -> bool:
+    """Run callback(session) when an MCP client session ends (DELETE, idle timeout or disconnect).
+
+    Registering the same callback for a session again is a no-op, so callers can hook every
+    request. The SDK has no public teardown hook; ServerSession closes its exit stack on
+    shutdown, so the hook is registered there. Returns False if that is not available.
+    """
+    callbacks = _session_close_callbacks.get(session)
+    if callbacks is None:
+        stack = getattr(session, "_exit_stack", None)
+        if stack is None:
+            logger.warning("Cannot watch %s for teardown; state is only dropped on failed sends", type(session).__name__)
+            return False
+        callbacks = _session_close_callbacks[session] = []
+        stack.callback(_session_closed, session)
+    if callback not in callbacks:
+        callbacks.append(callback)
+    return True
+
+
+def _session_closed(session: Any) -> None:
+    for callback in _session_close_callbacks.pop(session, []):
+        try:
+            callback(session)
+        except Exception as e:
+            logger.error("session teardown callback %s: %s", getattr(callback, "__qualname__", callback), e)
+
+
+def run_for_each_chassis(
+    fn: Callable[[Dict[str, Any]], _T], chassis_list: List[Dict[str, Any]], max_workers: int = 16
+) -> List[_T]:
+    """Run fn(chassis) for every chassis in a thread pool. Results keep the input order."""
+    if len(chassis_list) <= 1:
+        return [fn(c) for c in chassis_list]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(chassis_list))) as pool:
+        return list(pool.map(fn, chassis_list))
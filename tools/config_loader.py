@@ -20,7 +20,7 @@ def _find_config() -> Path:
 
 
 def load_config() -> dict:
-    """Load config/tools.yml. Returns dict with allowed_tools and allowed_ssh_commands."""
+    """Load config/tools.yml. Returns dict with allowed_tools, allowed_ssh_commands and optional sections."""
     import yaml
 
     path = _find_config()
@@ -34,6 +34,12 @@ def load_config() -> dict:
     return {
         "allowed_tools": list(at) if at else [],
         "allowed_ssh_commands": data.get("allowed_ssh_commands") or [],
+        "config_cache": data.get("config_cache") or {},
+        "telemetry": data.get("telemetry") or {},
+        "software_staging": data.get("software_staging") or {},
+        "log_follow": data.get("log_follow") or {},
+        "resources": data.get("resources") or {},
+        "server": data.get("server") or {},
     }
 
 
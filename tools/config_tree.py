@@ -0,0 +1,274 @@
+"""
+Parsed Junos configuration tree and per-chassis cache of the last full fetch.
+
+The text output of 'show configuration' is parsed into a tree of statements so
+hierarchy path lookups ('protocols bgp group X') and 'display set' slices can be
+served locally, without another SSH round-trip, while the config is unchanged.
+"""
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator
+
+from tools.config_loader import load_config
+from tools.ssh_broker import config_generation
+
+logger = __import__("logging").getLogger("ptx-mcp-server")
+
+# Default lifetime of a cached full configuration (seconds). Commits made through
+# edit_configuration/rollback_configuration invalidate the cache immediately; the TTL
+# bounds staleness for commits made outside this server.
+DEFAULT_CACHE_TTL_SEC = 300
+
+# Quoted strings (with escapes) or bare words
+_TOKEN_RE = re.compile(r'"(?:[^"\\]|\\.)*"|[^\s"]+')
+# Path tokens accepted for on-device fetches (no pipes, quotes or shell metacharacters; no
+# '*' either: unquoted 'cli show configuration ...' would be globbed by the login shell)
+_PATH_TOKEN_RE = re.compile(r"^[\w.:/\-+@,=]+$")
+# Statement flags Junos prints in front of a statement and their 'display set' verb
+_FLAG_VERBS = {"inactive": "deactivate", "protect": "protect"}
+
+
+@dataclass
+class ConfigNode:
+    """One configuration statement: a container ('foo bar { ... }') or a leaf ('foo bar;')."""
+
+    tokens: list[str]
+    leaf: bool = False
+    values: list[str] | None = None  # members of a '[ a b c ]' leaf list
+    flags: list[str] = field(default_factory=list)  # e.g. ['inactive']
+    children: Dict[str, "ConfigNode"] = field(default_factory=dict)
+
+    @property
+    def key(self) -> str:
+        key = " ".join(self.tokens)
+        if self.values is not None:
+            key += " [ " + " ".join(self.values) + " ]"
+        return key
+
+    def add(self, node: "ConfigNode") -> "ConfigNode":
+        existing = self.children.get(node.key)
+        if existing is not None and not node.leaf:
+            return existing
+        self.children[node.key] = node
+        return node
+
+
+def _tokenize(text: str) -> list[str]:
+    return _TOKEN_RE.findall(text)
+
+
+def _strip_trailing_comment(line: str) -> str:
+    """Drop a trailing '## ...' comment (e.g. '## SECRET-DATA') that is outside quotes."""
+    in_quote = False
+    i = 0
+    while i < len(line):
+        c = line[i]
+        if c == "\\" and in_quote:
+            i += 2
+            continue
+        if c == '"':
+            in_quote = not in_quote
+        elif not in_quote and line.startswith("##", i):
+            return line[:i].rstrip()
+        i += 1
+    return line
+
+
+def _parse_statement(head: str, leaf: bool) -> ConfigNode:
+    flags = []
+    while True:
+        word, _, rest = head.partition(" ")
+        if word.endswith(":") and word[:-1] in _FLAG_VERBS:
+            flags.append(word[:-1])
+            head = rest.strip()
+            continue
+        break
+    values = None
+    if leaf and head.endswith("]") and "[" in head:
+        lb = head.index("[")
+        values = _tokenize(head[lb + 1 : -1])
+        head = head[:lb]
+    return ConfigNode(tokens=_tokenize(head), leaf=leaf, values=values, flags=flags)
+
+
+def parse_config_text(text: str) -> ConfigNode:
+    """Parse hierarchical 'show configuration' output into a tree. Returns the root node."""
+    root = ConfigNode(tokens=[])
+    stack = [root]
+    in_block_comment = False
+    for raw in text.splitlines():
+        line = raw.strip()
+        if in_block_comment:
+            if "*/" in line:
+                in_block_comment = False
+            continue
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith("/*"):
+            in_block_comment = "*/" not in line
+            continue
+        line = _strip_trailing_comment(line)
+        if line == "}":
+            if len(stack) > 1:
+                stack.pop()
+            continue
+        if line.endswith("{"):
+            node = _parse_statement(line[:-1].strip(), leaf=False)
+            stack.append(stack[-1].add(node))
+        else:
+            stack[-1].add(_parse_statement(line.rstrip(";").strip(), leaf=True))
+    return root
+
+
+def parse_path(path: str) -> list[str]:
+    """Split a hierarchy path ('protocols bgp group X') into tokens, rejecting unsafe input."""
+    tokens = _tokenize((path or "").strip())
+    for tok in tokens:
+        bare = tok[1:-1] if tok.startswith('"') else tok
+        if not _PATH_TOKEN_RE.match(bare):
+            raise ValueError(f"invalid configuration path element: {tok!r}")
+    return tokens
+
+
+def find_nodes(root: ConfigNode, path: list[str]) -> tuple[list[tuple[list[str], ConfigNode]], bool]:
+    """Resolve a token path against the tree. Returns ([(parent_path_tokens, node), ...], exact).
+
+    Statement keys may span several tokens ('group X'), so each level tries the longest
+    exact key first. If the path ends partway through a key (e.g. 'protocols bgp group'),
+    every child whose statement starts with the remaining tokens is returned and exact is
+    False, however many there are.
+    """
+    node = root
+    above: list[str] = []
+    rest = list(path)
+    while rest:
+        for n in range(len(rest), 0, -1):
+            child = node.children.get(" ".join(rest[:n]))
+            if child is not None and not child.leaf:
+                break
+        else:
+            break
+        above = above + node.tokens
+        node, rest = child, rest[n:]
+    if not rest:
+        return [(above, node)], True
+    here = above + node.tokens
+    return [(here, child) for child in node.children.values() if child.tokens[: len(rest)] == rest], False
+
+
+def _render_head(node: ConfigNode) -> str:
+    flags = "".join(f"{f}: " for f in node.flags)
+    return flags + node.key
+
+
+def render_text(node: ConfigNode, indent: int = 0) -> Iterator[str]:
+    """Yield hierarchical text lines for node (including its own statement line)."""
+    pad = "    " * indent
+    if node.leaf:
+        yield f"{pad}{_render_head(node)};"
+        return
+    yield f"{pad}{_render_head(node)} {{"
+    for child in node.children.values():
+        yield from render_text(child, indent + 1)
+    yield f"{pad}}}"
+
+
+def render_set(node: ConfigNode, parent: list[str]) -> Iterator[str]:
+    """Yield 'display set' lines for node, with parent as the absolute path above it."""
+    here = parent + list(node.tokens)
+    if node.leaf:
+        for value in node.values if node.values is not None else [None]:
+            yield "set " + " ".join(here + ([value] if value is not None else []))
+    elif not node.children:
+        yield "set " + " ".join(here)
+    else:
+        for child in node.children.values():
+            yield from render_set(child, here)
+    for flag in node.flags:
+        yield f"{_FLAG_VERBS[flag]} " + " ".join(here)
+
+
+def render_matches(matches: list[tuple[list[str], ConfigNode]], format: str, exact: bool = True) -> str:
+    """Render find_nodes results like the device would ('show configuration <path>' [| display set]).
+
+    An exact match prints the contents of the statement; prefix matches keep each header.
+    """
+    lines: list[str] = []
+    for parent, node in matches:
+        if format == "set":
+            if not node.tokens:
+                for child in node.children.values():
+                    lines.extend(render_set(child, []))
+            else:
+                lines.extend(render_set(node, parent))
+        elif node.leaf or not exact:
+            lines.extend(render_text(node))
+        else:
+            # Like the device: 'show configuration protocols bgp' prints the contents of bgp
+            for child in node.children.values():
+                lines.extend(render_text(child))
+    return "\n".join(lines)
+
+
+@dataclass
+class ConfigSnapshot:
+    """A full configuration fetch for one chassis: raw text plus its parsed tree."""
+
+    text: str
+    root: ConfigNode
+    fetched_at: float
+    generation: int = 0  # SSH broker config change counter at fetch time (multi-process mode)
+
+
+_snapshots: dict[str, ConfigSnapshot] = {}
+
+
+def cache_ttl_sec() -> float:
+    """Return config_cache.ttl_sec from config/tools.yml (0 disables the cache)."""
+    try:
+        return float(load_config().get("config_cache", {}).get("ttl_sec", DEFAULT_CACHE_TTL_SEC))
+    except (FileNotFoundError, TypeError, ValueError):
+        return DEFAULT_CACHE_TTL_SEC
+
+
+def chassis_cache_key(chassis: Dict[str, Any]) -> str:
+    return f"{chassis['host']}:{chassis.get('port', 22)}"
+
+
+def store_snapshot(chassis: Dict[str, Any], text: str) -> ConfigSnapshot:
+    """Parse and cache a full configuration fetch for chassis."""
+    start = time.monotonic()
+    snap = ConfigSnapshot(
+        text=text,
+        root=parse_config_text(text),
+        fetched_at=time.monotonic(),
+        generation=config_generation(chassis),
+    )
+    _snapshots[chassis_cache_key(chassis)] = snap
+    logger.info(
+        "config tree: indexed %s (%d bytes, %d top-level statements) in %d ms",
+        chassis_cache_key(chassis),
+        len(text),
+        len(snap.root.children),
+        int((time.monotonic() - start) * 1000),
+    )
+    return snap
+
+
+def get_snapshot(chassis: Dict[str, Any], ttl_sec: float = DEFAULT_CACHE_TTL_SEC) -> ConfigSnapshot | None:
+    """Return the cached snapshot for chassis if it is younger than ttl_sec, else None."""
+    snap = _snapshots.get(chassis_cache_key(chassis))
+    if snap is None or ttl_sec <= 0:
+        return None
+    if time.monotonic() - snap.fetched_at > ttl_sec:
+        return None
+    # Another worker process may have committed since this snapshot was taken
+    if snap.generation != config_generation(chassis):
+        return None
+    return snap
+
+
+def invalidate_snapshot(chassis: Dict[str, Any]) -> None:
+    """Drop the cached configuration for chassis (call after a commit or rollback)."""
+    _snapshots.pop(chassis_cache_key(chassis), None)
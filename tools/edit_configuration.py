@@ -1,6 +1,9 @@
 """MCP tool: modify configuration on the PTX via SSH (configure private, load merge/set, commit)."""
+import asyncio
+
 from tools.chassis_manager import get_chassis
 from tools.common import run_cli_stdin_on_ptx
+from tools.chassis_state import notify_chassis_changed
 
 logger = __import__("logging").getLogger("ptx-mcp-server")
 
@@ -34,7 +37,10 @@ async def edit_configuration(
         if commit:
             stdin_content += "commit\n"
         stdin_content += "exit\n"
-        ok, out = run_cli_stdin_on_ptx("cli", stdin_content, chassis, timeout_sec=120)
+        ok, out = await asyncio.to_thread(run_cli_stdin_on_ptx, "cli", stdin_content, chassis, timeout_sec=120)
+        if commit:
+            # Any commit attempt may have changed the device config: drop caches, notify subscribers
+            await notify_chassis_changed(chassis, config=True, facts=True)
         if not ok:
             return f"Error:\n{out}"
         return out
@@ -0,0 +1,65 @@
+"""MCP tool: follow a local /var/log file or a chassis log and push new lines as notifications."""
+from mcp.server.fastmcp import Context
+
+from tools.chassis_manager import get_chassis
+from tools.common import _log_tool_call, resolve_var_log_path
+from tools.log_follow import set_session_level, start_subscription
+
+logger = __import__("logging").getLogger("ptx-mcp-server")
+
+
+async def follow_log(
+    ctx: Context,
+    source: str = "local",
+    filename: str | None = None,
+    match: str | None = None,
+    chassis_id: str | None = None,
+) -> str:
+    """
+    Start following a log and receive newly appended lines as MCP notifications (no polling).
+
+    New lines matching the filter are pushed as notifications/message with logger 'follow_log/<id>'.
+    Buffers are bounded: if the client falls behind, the oldest lines are dropped and counted.
+    Call unfollow_log with the returned subscription ID to stop.
+
+    Args:
+        source: 'local' for a file under /var/log on the MCP server, 'device' for /var/log/<filename> on a chassis (like 'monitor start').
+        filename: Log filename. Defaults to "syslog" (local) or "messages" (device).
+        match: Optional regex (or substring) filter; only matching lines are sent.
+        chassis_id: ID of the target chassis for source='device' (e.g. "ch0"). If omitted and only one chassis is configured, it is used automatically.
+    """
+    try:
+        src = (source or "local").strip().lower()
+        if src == "local":
+            path = resolve_var_log_path(filename or "syslog")
+            sub = start_subscription(ctx.session, "local", match, path=path)
+        elif src == "device":
+            chassis = get_chassis(chassis_id)
+            sub = start_subscription(ctx.session, "device", match, chassis=chassis, filename=(filename or "messages").strip())
+        else:
+            return "Error: source must be 'local' or 'device'."
+        _log_tool_call("TOOL: follow_log", subscription_id=sub.id, source=src, target=sub.target, match=match)
+        return (
+            f"Following {sub.target} (subscription {sub.id}). New lines arrive as notifications with "
+            f"logger 'follow_log/{sub.id}'. Call unfollow_log(subscription_id='{sub.id}') to stop."
+        )
+    except Exception as e:
+        logger.error("follow_log: %s", e)
+        return f"Error: {str(e)}"
+
+
+def register(mcp):
+    """Register this tool with the FastMCP server."""
+    if mcp.settings.stateless_http:
+        # Multi-process mode: notifications cannot outlive the request that started the follow
+        logger.warning("follow_log: not available with stateless HTTP (server.workers > 1)")
+        return
+    mcp.tool()(follow_log)
+
+    server = mcp._mcp_server
+
+    # Lines are sent as notifications/message; a logging/setLevel handler makes the server
+    # advertise the logging capability so clients accept them and can filter by level
+    @server.set_logging_level()
+    async def _set_logging_level(level) -> None:
+        set_session_level(server.request_context.session, level)
@@ -1,28 +1,81 @@
 """MCP tool: retrieve current configuration from the PTX via SSH."""
+import asyncio
+import time
+
 from tools.chassis_manager import get_chassis
-from tools.common import run_cli_command_on_ptx
+from tools.common import run_cli_command_on_ptx, _log_tool_call
+from tools.config_tree import (
+    cache_ttl_sec,
+    find_nodes,
+    get_snapshot,
+    parse_path,
+    render_matches,
+    store_snapshot,
+)
 
 logger = __import__("logging").getLogger("ptx-mcp-server")
 
 
-async def get_configuration(format: str = "text", chassis_id: str | None = None) -> str:
+async def get_configuration(
+    format: str = "text",
+    chassis_id: str | None = None,
+    path: str | None = None,
+    refresh: bool = False,
+) -> str:
     """
     Retrieve the current configuration of a PTX chassis via SSH.
 
+    The last full configuration fetched from each chassis is parsed and kept in memory, so
+    path lookups and 'set' slices are answered locally while it is fresh. Commits made through
+    edit_configuration/rollback_configuration drop the cached copy; commits made elsewhere are
+    only seen after the cache expires, so cached answers start with a note giving their age.
+
     Args:
         format: 'text' for hierarchical config, 'set' for set commands. Defaults to text.
         chassis_id: ID of the target chassis from config/chassis.yml (e.g. "ch0"). If omitted and only one chassis is configured, it is used automatically.
+        path: Optional hierarchy path (e.g. "protocols bgp group CORE"). Only that subtree is returned; on a cache miss only that subtree is fetched from the device.
+        refresh: If true, ignore the cached configuration and fetch from the device.
     """
     try:
         chassis = get_chassis(chassis_id)
-        if format and format.strip().lower() == "set":
-            cmd = "show configuration | display set"
+        fmt = "set" if format and format.strip().lower() == "set" else "text"
+        tokens = parse_path(path) if path else []
+        snap = None if refresh else get_snapshot(chassis, ttl_sec=cache_ttl_sec())
+        _log_tool_call(
+            "TOOL: get_configuration",
+            chassis_id=chassis_id,
+            format=fmt,
+            path=" ".join(tokens) or "(full)",
+            cache="hit" if snap else "miss",
+        )
+
+        if snap is None and tokens:
+            # Partial fetch: only the requested subtree crosses the wire
+            cmd = "show configuration " + " ".join(tokens)
+            if fmt == "set":
+                cmd += " | display set"
+            ok, out = await asyncio.to_thread(run_cli_command_on_ptx, cmd, chassis, timeout_sec=120)
+            if not ok:
+                return f"Error:\n{out}"
+            return out
+
+        note = ""
+        if snap is None:
+            # Multi-MB fetch and full parse: keep both off the event loop
+            ok, out = await asyncio.to_thread(run_cli_command_on_ptx, "show configuration", chassis, timeout_sec=120)
+            if not ok:
+                return f"Error:\n{out}"
+            snap = await asyncio.to_thread(store_snapshot, chassis, out)
         else:
-            cmd = "show configuration"
-        ok, out = run_cli_command_on_ptx(cmd, chassis, timeout_sec=120)
-        if not ok:
-            return f"Error:\n{out}"
-        return out
+            age = int(time.monotonic() - snap.fetched_at)
+            note = f"(cached, {age}s old; refresh=true to refetch)\n"
+
+        if fmt == "text" and not tokens:
+            return note + snap.text
+        matches, exact = find_nodes(snap.root, tokens)
+        if not matches:
+            return f"Error: nothing configured at '{' '.join(tokens)}'. {note.strip()}".rstrip()
+        return note + (render_matches(matches, fmt, exact) or "(no output)")
     except Exception as e:
         logger.error("get_configuration: %s", e)
         return f"Error: {str(e)}"
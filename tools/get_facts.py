@@ -1,38 +1,50 @@
 """MCP tool: retrieve device facts from the PTX via SSH (show version, show system information)."""
-from tools.chassis_manager import get_chassis
-from tools.common import run_cli_command_on_ptx, _log_tool_call
+import asyncio
+from typing import Any, Dict
+
+from tools.chassis_manager import get_chassis, get_chassis_selection
+from tools.common import run_cli_command_on_ptx, run_for_each_chassis, _log_tool_call
 
 logger = __import__("logging").getLogger("ptx-mcp-server")
 
 
-async def get_facts(chassis_id: str | None = None) -> str:
+def _collect_facts(chassis: Dict[str, Any]) -> str:
+    out_parts = []
+    for cmd in ("show version", "show system information"):
+        _log_tool_call("TOOL: get_facts COMMAND", command=cmd)
+        ok, out = run_cli_command_on_ptx(cmd, chassis)
+        _log_tool_call(
+            "TOOL: get_facts COMMAND RESULT",
+            command=cmd,
+            success=ok,
+            output_len=len(out),
+            output_preview=out[:400] if out else "(none)",
+        )
+        if ok:
+            out_parts.append(f"--- {cmd} ---\n{out}")
+        else:
+            out_parts.append(f"--- {cmd} (error) ---\n{out}")
+    _log_tool_call("TOOL: get_facts RESULT", parts=len(out_parts), success=len(out_parts) == 2)
+    return "\n\n".join(out_parts) if out_parts else "No output."
+
+
+async def get_facts(chassis_id: str | None = None, selector: str | None = None) -> str:
     """
     Retrieve device facts (model, version, serial, hostname, etc.) from a PTX chassis via SSH.
     Runs 'show version' and 'show system information' and returns the combined output.
 
     Args:
         chassis_id: ID of the target chassis from config/chassis.yml (e.g. "ch0"). If omitted and only one chassis is configured, it is used automatically.
+        selector: Optional chassis selector (e.g. "role=core,site=ams*"); collects facts from every match in parallel instead of chassis_id.
     """
-    _log_tool_call("TOOL: get_facts", chassis_id=chassis_id, started=True)
+    _log_tool_call("TOOL: get_facts", chassis_id=chassis_id, selector=selector, started=True)
     try:
-        chassis = get_chassis(chassis_id)
-        out_parts = []
-        for cmd in ("show version", "show system information"):
-            _log_tool_call("TOOL: get_facts COMMAND", command=cmd)
-            ok, out = run_cli_command_on_ptx(cmd, chassis)
-            _log_tool_call(
-                "TOOL: get_facts COMMAND RESULT",
-                command=cmd,
-                success=ok,
-                output_len=len(out),
-                output_preview=out[:400] if out else "(none)",
-            )
-            if ok:
-                out_parts.append(f"--- {cmd} ---\n{out}")
-            else:
-                out_parts.append(f"--- {cmd} (error) ---\n{out}")
-        _log_tool_call("TOOL: get_facts RESULT", parts=len(out_parts), success=len(out_parts) == 2)
-        return "\n\n".join(out_parts) if out_parts else "No output."
+        if selector:
+            targets = get_chassis_selection(selector)
+            # Blocking SSH fan-out: keep it off the event loop
+            results = await asyncio.to_thread(run_for_each_chassis, _collect_facts, targets)
+            return "\n\n".join(f"=== {c['id']} ===\n{out}" for c, out in zip(targets, results))
+        return await asyncio.to_thread(_collect_facts, get_chassis(chassis_id))
     except Exception as e:
         _log_tool_call("TOOL: get_facts EXCEPTION", error=str(e), error_type=type(e).__name__)
         logger.error("get_facts: %s", e)
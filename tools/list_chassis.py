@@ -1,21 +1,47 @@
-"""MCP tool: list all configured PTX chassis."""
+"""MCP tool: list configured PTX chassis (filterable by selector, paged)."""
 from tools.chassis_manager import list_all_chassis
 
 
-async def list_chassis() -> str:
+async def list_chassis(selector: str | None = None, page: int = 0, page_size: int = 100) -> str:
     """
-    List all available PTX chassis and their IDs.
+    List available PTX chassis and their IDs.
 
-    Returns the chassis_id, hostname, and port for each configured chassis.
+    Returns the chassis_id, hostname, port, groups and tags for each matching chassis, one page at a time.
     Use the chassis_id value when calling other tools (e.g. run_cli, get_facts) to target a specific chassis.
+
+    Args:
+        selector: Optional filter, e.g. "role=core,site=ams*" (comma = AND, '|' = OR, globs allowed).
+            Keys are tags (site, role, platform, ...) or id/group/host; a bare pattern matches the chassis ID.
+        page: Page index (0 = first page).
+        page_size: Number of chassis per page (max 1000).
     """
-    chassis = list_all_chassis()
+    if page < 0:
+        return "Error: page must be >= 0"
+    if page_size <= 0 or page_size > 1000:
+        return "Error: page_size must be between 1 and 1000"
+    chassis = list_all_chassis(selector)
     if not chassis:
+        if selector:
+            return f"No chassis match selector '{selector}'."
         return "No chassis configured. Create config/chassis.yml (see chassis.yml.example)."
+    ids = list(chassis)
+    start = page * page_size
+    page_ids = ids[start : start + page_size]
+    if not page_ids:
+        return f"Error: page {page} is out of range ({len(ids)} chassis, page_size {page_size})."
     lines = []
-    for cid, info in chassis.items():
-        lines.append(f"  {cid}: {info['host']}:{info['port']} (user: {info['username'] or '(none)'})")
-    return "Available chassis:\n" + "\n".join(lines)
+    for cid in page_ids:
+        info = chassis[cid]
+        extra = ""
+        if info["groups"]:
+            extra += f" groups: {','.join(info['groups'])}"
+        if info["tags"]:
+            extra += " tags: " + ",".join(f"{k}={v}" for k, v in sorted(info["tags"].items()))
+        lines.append(f"  {cid}: {info['host']}:{info['port']} (user: {info['username'] or '(none)'}){extra}")
+    header = f"Available chassis ({start + 1}-{start + len(page_ids)} of {len(ids)}):"
+    if start + len(page_ids) < len(ids):
+        lines.append(f"  ... more on page {page + 1}")
+    return header + "\n" + "\n".join(lines)
 
 
 def register(mcp):
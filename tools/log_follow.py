@@ -0,0 +1,300 @@
+"""
+Live log follow subscriptions pushed to MCP clients as notifications.
+
+A subscription follows either a local file under /var/log (cheap stat polling: only bytes
+appended since the last offset are read; rotation/truncation restarts at offset 0) or a
+log file on a chassis (a long-lived SSH exec channel running 'tail -F', like
+'monitor start'). New lines that pass the match filter go into a bounded buffer and are
+sent as 'notifications/message' with logger 'follow_log/<id>'. When the client cannot
+keep up, the oldest buffered lines are dropped and counted.
+
+Subscriptions belong to the client session that created them: only that session can list
+or stop them, the subscription limit applies per session, and they are cancelled when the
+session ends.
+"""
+import asyncio
+import re
+import threading
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict
+
+from tools.common import apply_match_filter, on_session_closed, open_ssh_client
+from tools.config_loader import load_config
+from tools.ssh_broker import device_session
+
+logger = __import__("logging").getLogger("ptx-mcp-server")
+
+DEFAULT_MAX_SUBSCRIPTIONS = 16
+DEFAULT_MAX_BUFFER_LINES = 1000
+DEFAULT_POLL_INTERVAL_SEC = 1.0
+DEFAULT_MAX_DURATION_SEC = 3600
+
+# Max bytes read from a local file per poll and lines per notification
+_MAX_READ_BYTES = 1_000_000
+_MAX_LINES_PER_NOTIFICATION = 200
+
+_DEVICE_LOG_NAME_RE = re.compile(r"^[\w.\-]+$")
+
+# MCP log levels by increasing severity (logging/setLevel)
+_LEVELS = ["debug", "info", "notice", "warning", "error", "critical", "alert", "emergency"]
+
+
+@dataclass
+class LogSubscription:
+    id: str
+    source: str  # 'local' | 'device'
+    target: str
+    match: str | None
+    session: Any
+    max_buffer: int
+    buffer: deque = field(default_factory=deque)
+    dropped: int = 0
+    sent: int = 0
+    created: float = field(default_factory=time.time)
+    wakeup: asyncio.Event = field(default_factory=asyncio.Event)
+    task: asyncio.Task | None = None
+    client: Any = None  # SSH client for device follows (closed on unsubscribe)
+
+    def push(self, lines: list[str]) -> None:
+        """Filter and buffer new lines (call on the event loop thread)."""
+        lines = apply_match_filter([ln for ln in lines if ln.strip()], self.match)
+        for line in lines:
+            if len(self.buffer) >= self.max_buffer:
+                self.buffer.popleft()
+                self.dropped += 1
+            self.buffer.append(line)
+        if lines:
+            self.wakeup.set()
+
+    def describe(self) -> str:
+        age = int(time.time() - self.created)
+        return (
+            f"{self.id}: {self.source} {self.target} match={self.match or '(none)'} "
+            f"sent={self.sent} dropped={self.dropped} buffered={len(self.buffer)} age={age}s"
+        )
+
+
+_subscriptions: dict[str, LogSubscription] = {}
+# client session -> minimum level requested with logging/setLevel
+_session_levels: dict[Any, str] = {}
+
+
+def _session_closed(session: Any) -> None:
+    _session_levels.pop(session, None)
+    for sub in list_subscriptions(session):
+        stop_subscription(sub.id, session)
+
+
+def set_session_level(session: Any, level: str) -> None:
+    """Record the minimum log level a client asked for (logging/setLevel)."""
+    _session_levels[session] = level
+    on_session_closed(session, _session_closed)
+
+
+def _wants(session: Any, level: str) -> bool:
+    return _LEVELS.index(level) >= _LEVELS.index(_session_levels.get(session, "debug"))
+
+
+def follow_settings() -> Dict[str, Any]:
+    """Return the log_follow section of config/tools.yml with defaults applied."""
+    try:
+        raw = load_config().get("log_follow") or {}
+    except FileNotFoundError:
+        raw = {}
+    return {
+        "max_subscriptions": int(raw.get("max_subscriptions", DEFAULT_MAX_SUBSCRIPTIONS)),
+        "max_buffer_lines": int(raw.get("max_buffer_lines", DEFAULT_MAX_BUFFER_LINES)),
+        "poll_interval_sec": float(raw.get("poll_interval_sec", DEFAULT_POLL_INTERVAL_SEC)),
+        "max_duration_sec": float(raw.get("max_duration_sec", DEFAULT_MAX_DURATION_SEC)),
+    }
+
+
+async def _follow_local(sub: LogSubscription, path: Path, poll_interval: float) -> None:
+    st = path.stat()
+    offset, inode = st.st_size, st.st_ino
+    partial = b""
+    while True:
+        await asyncio.sleep(poll_interval)
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            continue  # rotated away; wait for the new file
+        if st.st_ino != inode or st.st_size < offset:
+            offset, inode, partial = 0, st.st_ino, b""
+        if st.st_size == offset:
+            continue
+        with path.open("rb") as f:
+            f.seek(offset)
+            data = f.read(min(st.st_size - offset, _MAX_READ_BYTES))
+        offset += len(data)
+        *complete, partial = (partial + data).split(b"\n")
+        sub.push([ln.decode("utf-8", errors="replace") for ln in complete])
+
+
+def _device_reader(sub: LogSubscription, chassis: Dict[str, Any], filename: str,
+                   loop: asyncio.AbstractEventLoop, stop: threading.Event) -> None:
+    """Blocking reader thread: stream 'tail -F' output from the device into the subscription."""
+    with device_session(chassis):
+        client = open_ssh_client(chassis)
+        sub.client = client
+        try:
+            channel = client.get_transport().open_session()
+            channel.exec_command(f"tail -n 0 -F /var/log/{filename}")
+            partial = b""
+            while not stop.is_set():
+                data = channel.recv(65536)
+                if not data:
+                    break
+                *complete, partial = (partial + data).split(b"\n")
+                if complete:
+                    lines = [ln.decode("utf-8", errors="replace") for ln in complete]
+                    loop.call_soon_threadsafe(sub.push, lines)
+        finally:
+            client.close()
+
+
+def _settle(done: asyncio.Future, error: BaseException | None) -> None:
+    if done.done():
+        return
+    if error is None:
+        done.set_result(None)
+    else:
+        done.set_exception(error)
+
+
+async def _follow_device(sub: LogSubscription, chassis: Dict[str, Any], filename: str) -> None:
+    loop = asyncio.get_running_loop()
+    done = loop.create_future()
+    stop = threading.Event()
+
+    def reader() -> None:
+        error = None
+        try:
+            _device_reader(sub, chassis, filename, loop, stop)
+        except BaseException as e:
+            error = e
+        try:
+            loop.call_soon_threadsafe(_settle, done, error)
+        except RuntimeError:
+            pass  # event loop already closed
+
+    # A dedicated thread rather than asyncio.to_thread: a follow lasts up to max_duration_sec
+    # and must not hold one of the default executor's workers that other tools rely on
+    threading.Thread(target=reader, name=f"follow-log-{sub.id}", daemon=True).start()
+    try:
+        await done
+    finally:
+        # Cancelling the await does not stop the thread; closing the client unblocks recv()
+        stop.set()
+        if sub.client is not None:
+            sub.client.close()
+
+
+async def _flush(sub: LogSubscription) -> None:
+    if not _wants(sub.session, "info"):
+        sub.buffer.clear()  # client raised its log level above the level of log lines
+        return
+    while sub.buffer:
+        batch = [sub.buffer.popleft() for _ in range(min(len(sub.buffer), _MAX_LINES_PER_NOTIFICATION))]
+        await sub.session.send_log_message(
+            level="info",
+            data={"subscription_id": sub.id, "target": sub.target, "lines": batch, "dropped": sub.dropped},
+            logger=f"follow_log/{sub.id}",
+        )
+        sub.sent += len(batch)
+
+
+async def _send_loop(sub: LogSubscription) -> None:
+    while True:
+        await sub.wakeup.wait()
+        sub.wakeup.clear()
+        await _flush(sub)
+
+
+async def _run(sub: LogSubscription, follower, max_duration: float) -> None:
+    follow_task = asyncio.create_task(follower)
+    send_task = asyncio.create_task(_send_loop(sub))
+    reason = "unsubscribed"
+    try:
+        async with asyncio.timeout(max_duration if max_duration > 0 else None):
+            done, _ = await asyncio.wait({follow_task, send_task}, return_when=asyncio.FIRST_COMPLETED)
+        for t in done:
+            t.result()
+        # Follower ended on its own (e.g. device closed the stream): deliver what is left
+        reason = "source closed"
+        await _flush(sub)
+    except asyncio.CancelledError:
+        pass
+    except TimeoutError:
+        reason = "max duration reached"
+    except Exception as e:
+        # Typically the connection to the device failed or the client went away
+        reason = f"{type(e).__name__}: {e}"
+    finally:
+        follow_task.cancel()
+        send_task.cancel()
+        _subscriptions.pop(sub.id, None)
+        if sub.client is not None:
+            sub.client.close()
+    logger.info("follow_log %s stopped: %s", sub.id, reason)
+    if not _wants(sub.session, "notice"):
+        return
+    try:
+        await sub.session.send_log_message(
+            level="notice",
+            data={"subscription_id": sub.id, "target": sub.target, "stopped": reason},
+            logger=f"follow_log/{sub.id}",
+        )
+    except Exception:
+        pass
+
+
+def start_subscription(session: Any, source: str, match: str | None, path: Path | None = None,
+                       chassis: Dict[str, Any] | None = None, filename: str | None = None) -> LogSubscription:
+    """Create and start a subscription on a local path or a chassis log file for session.
+
+    Raises ValueError if the session's subscription limit is reached or the device filename is unsafe.
+    """
+    settings = follow_settings()
+    active = len(list_subscriptions(session))
+    if active >= settings["max_subscriptions"]:
+        raise ValueError(f"Too many log subscriptions ({active}); unfollow_log an existing one first.")
+    if source == "device" and not _DEVICE_LOG_NAME_RE.match(filename or ""):
+        raise ValueError("device log filename must be a plain name under /var/log (e.g. 'messages')")
+    target = str(path) if source == "local" else f"{chassis.get('id') or chassis['host']}:/var/log/{filename}"
+    sub = LogSubscription(
+        id=uuid.uuid4().hex[:8],
+        source=source,
+        target=target,
+        match=match,
+        session=session,
+        max_buffer=settings["max_buffer_lines"],
+    )
+    if source == "local":
+        follower = _follow_local(sub, path, settings["poll_interval_sec"])
+    else:
+        follower = _follow_device(sub, chassis, filename)
+    _subscriptions[sub.id] = sub
+    on_session_closed(session, _session_closed)
+    sub.task = asyncio.create_task(_run(sub, follower, settings["max_duration_sec"]))
+    return sub
+
+
+def stop_subscription(subscription_id: str, session: Any) -> LogSubscription | None:
+    """Cancel one of session's subscriptions. Returns it, or None if unknown to this session."""
+    sub = _subscriptions.get(subscription_id)
+    if sub is None or sub.session is not session:
+        return None
+    del _subscriptions[subscription_id]
+    if sub.task is not None:
+        sub.task.cancel()
+    return sub
+
+
+def list_subscriptions(session: Any) -> list[LogSubscription]:
+    """Return the subscriptions created by session."""
+    return [sub for sub in _subscriptions.values() if sub.session is session]
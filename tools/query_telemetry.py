@@ -0,0 +1,77 @@
+"""MCP tool: answer current-value and trend questions from the local telemetry store (no SSH)."""
+import time
+
+from tools.chassis_manager import get_chassis
+from tools.common import _log_tool_call
+from tools.telemetry_poller import get_telemetry_store
+
+logger = __import__("logging").getLogger("ptx-mcp-server")
+
+
+def _fmt(value: float) -> str:
+    return f"{value:.0f}" if value == int(value) and abs(value) < 1e15 else f"{value:.2f}"
+
+
+async def query_telemetry(
+    metric: str = "*",
+    chassis_id: str | None = None,
+    last_minutes: int | None = None,
+    max_metrics: int = 50,
+) -> str:
+    """
+    Query counters collected by the background telemetry poller, without touching the device.
+
+    Without last_minutes, returns the current (most recent) value of each matching metric.
+    With last_minutes, returns a trend summary (first, last, min, avg, max, change per minute).
+    Metric names look like 're0.cpu_idle_pct', 're0.memory_utilization_pct', 'alarms.active',
+    'interface.et-0/0/0.input_bps'. Use metric="*" to list what is available.
+
+    Args:
+        metric: Metric name or glob pattern (e.g. "re0.*", "interface.et-0/0/0.*"). Defaults to all.
+        chassis_id: ID of the target chassis from config/chassis.yml (e.g. "ch0"). If omitted and only one chassis is configured, it is used automatically.
+        last_minutes: Optional trend window in minutes.
+        max_metrics: Max number of metrics to return.
+    """
+    try:
+        chassis = get_chassis(chassis_id)
+        cid = chassis["id"]
+        pattern = (metric or "*").strip() or "*"
+        store = get_telemetry_store()
+        _log_tool_call("TOOL: query_telemetry", chassis_id=cid, metric=pattern, last_minutes=last_minutes)
+        now = time.time()
+
+        if last_minutes is None:
+            rows = store.latest(cid, pattern)
+            if not rows:
+                return f"No telemetry for '{pattern}' on {cid}. Is the telemetry poller enabled in config/tools.yml?"
+            lines = [f"  {m} = {_fmt(v)} ({int(now - ts)}s ago)" for m, ts, v in rows[:max_metrics]]
+            more = f"\n  ... {len(rows) - max_metrics} more" if len(rows) > max_metrics else ""
+            return f"Current telemetry for {cid}:\n" + "\n".join(lines) + more
+
+        if last_minutes <= 0:
+            return "Error: last_minutes must be > 0"
+        series = store.series(cid, pattern, since=now - last_minutes * 60)
+        if not series:
+            return f"No telemetry for '{pattern}' on {cid} in the last {last_minutes} minutes."
+        lines = []
+        for m, points in list(series.items())[:max_metrics]:
+            values = [v for _, v, _, _ in points]
+            first_ts, first = points[0][0], points[0][1]
+            last_ts, last = points[-1][0], points[-1][1]
+            span_min = (last_ts - first_ts) / 60
+            rate = f", {(last - first) / span_min:+.2f}/min" if span_min > 0 else ""
+            lines.append(
+                f"  {m}: last={_fmt(last)} first={_fmt(first)} min={_fmt(min(lo for _, _, lo, _ in points))} "
+                f"avg={_fmt(sum(values) / len(values))} max={_fmt(max(hi for _, _, _, hi in points))} "
+                f"change={last - first:+.2f}{rate} ({len(points)} samples)"
+            )
+        more = f"\n  ... {len(series) - max_metrics} more" if len(series) > max_metrics else ""
+        return f"Telemetry trend for {cid}, last {last_minutes} min:\n" + "\n".join(lines) + more
+    except Exception as e:
+        _log_tool_call("TOOL: query_telemetry EXCEPTION", error=str(e), error_type=type(e).__name__)
+        logger.error("query_telemetry: %s", e)
+        return f"Error: {str(e)}"
+
+
+def register(mcp):
+    mcp.tool()(query_telemetry)
@@ -1,6 +1,9 @@
 """MCP tool: rollback configuration on the PTX via SSH."""
+import asyncio
+
 from tools.chassis_manager import get_chassis
 from tools.common import run_cli_stdin_on_ptx
+from tools.chassis_state import notify_chassis_changed
 
 logger = __import__("logging").getLogger("ptx-mcp-server")
 
@@ -17,7 +20,9 @@ async def rollback_configuration(rollback_id: int = 0, chassis_id: str | None =
     try:
         chassis = get_chassis(chassis_id)
         stdin_content = f"configure private\nrollback {rollback_id}\ncommit\nexit\n"
-        ok, out = run_cli_stdin_on_ptx("cli", stdin_content, chassis, timeout_sec=90)
+        ok, out = await asyncio.to_thread(run_cli_stdin_on_ptx, "cli", stdin_content, chassis, timeout_sec=90)
+        # Any commit attempt may have changed the device config: drop caches, notify subscribers
+        await notify_chassis_changed(chassis, config=True, facts=True)
         if not ok:
             return f"Error:\n{out}"
         return out
@@ -1,12 +1,14 @@
 """MCP tool: run allowed CLI commands on the PTX via SSH (allowlist with regex)."""
-from tools.chassis_manager import get_chassis
-from tools.common import run_cli_command_on_ptx, _log_tool_call
+import asyncio
+
+from tools.chassis_manager import get_chassis, get_chassis_selection
+from tools.common import run_cli_command_on_ptx, run_for_each_chassis, _log_tool_call
 from tools.config_loader import is_command_allowed
 
 logger = __import__("logging").getLogger("ptx-mcp-server")
 
 
-async def run_cli(command: str, chassis_id: str | None = None) -> str:
+async def run_cli(command: str, chassis_id: str | None = None, selector: str | None = None) -> str:
     """
     Run a single CLI command on a PTX chassis via SSH.
 
@@ -16,9 +18,10 @@ async def run_cli(command: str, chassis_id: str | None = None) -> str:
     Args:
         command: Full CLI command to run (e.g. "show version", "show system users").
         chassis_id: ID of the target chassis from config/chassis.yml (e.g. "ch0"). If omitted and only one chassis is configured, it is used automatically.
+        selector: Optional chassis selector (e.g. "role=core,site=ams*"); runs the command on every match in parallel instead of chassis_id.
     """
     cmd = (command or "").strip()
-    _log_tool_call("TOOL: run_cli", command=cmd or "(empty)", chassis_id=chassis_id, allowed=None)
+    _log_tool_call("TOOL: run_cli", command=cmd or "(empty)", chassis_id=chassis_id, selector=selector, allowed=None)
     try:
         if not cmd:
             _log_tool_call("TOOL: run_cli RESULT", result="rejected", reason="command empty")
@@ -31,8 +34,21 @@ async def run_cli(command: str, chassis_id: str | None = None) -> str:
                 "Error: command is not allowed by the configured allowlist (allowed_ssh_commands in config/tools.yml). "
                 "Only commands matching one of the regex patterns are permitted."
             )
+        if selector:
+            targets = get_chassis_selection(selector)
+            # Blocking SSH fan-out: keep it off the event loop
+            results = await asyncio.to_thread(run_for_each_chassis, lambda c: run_cli_command_on_ptx(cmd, c), targets)
+            _log_tool_call(
+                "TOOL: run_cli RESULT",
+                chassis=len(targets),
+                success=sum(1 for ok, _ in results if ok),
+            )
+            return "\n\n".join(
+                f"=== {c['id']} ===\n" + (out if ok else f"Error running CLI command:\n{out}")
+                for c, (ok, out) in zip(targets, results)
+            )
         chassis = get_chassis(chassis_id)
-        ok, output = run_cli_command_on_ptx(cmd, chassis)
+        ok, output = await asyncio.to_thread(run_cli_command_on_ptx, cmd, chassis)
         _log_tool_call(
             "TOOL: run_cli RESULT",
             success=ok,
@@ -0,0 +1,196 @@
+"""
+Stage local software images onto PTX chassis over SFTP before 'request system software add'.
+
+Uploads go to '<remote_dir>/<name>.part' with pipelined writes (no per-chunk round-trip),
+resume from the remote partial size after a disconnect, and are renamed into place only
+after the remote SHA-256 matches. Chassis that already hold the image with the right
+checksum are skipped without transferring anything.
+"""
+import hashlib
+import re
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict
+
+from tools.common import _log_tool_call, open_ssh_client, wrap_cli_command
+from tools.config_loader import load_config
+from tools.ssh_broker import device_session
+
+logger = __import__("logging").getLogger("ptx-mcp-server")
+
+_PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+DEFAULT_IMAGE_DIR = "images"
+DEFAULT_REMOTE_DIR = "/var/tmp"
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+DEFAULT_RETRIES = 3
+DEFAULT_MAX_PARALLEL = 8
+
+_SAFE_NAME_RE = re.compile(r"^[\w.+\-]+$")
+_SHA256_RE = re.compile(r"\b([0-9a-fA-F]{64})\b")
+
+# (path, size, mtime) -> sha256 hex; images are large, hash each version once
+_local_digests: dict[tuple[str, int, float], str] = {}
+
+
+@dataclass
+class StageResult:
+    chassis_id: str
+    remote_path: str
+    status: str  # 'present' | 'uploaded' | 'failed'
+    bytes_sent: int = 0
+    seconds: float = 0.0
+    message: str = ""
+
+    @property
+    def ok(self) -> bool:
+        return self.status in ("present", "uploaded")
+
+    def summary(self) -> str:
+        if self.status == "uploaded":
+            rate = self.bytes_sent / self.seconds / 1e6 if self.seconds > 0 else 0.0
+            return f"uploaded {self.bytes_sent} bytes in {self.seconds:.1f}s ({rate:.1f} MB/s), checksum verified"
+        if self.status == "present":
+            return "already present, checksum verified (skipped upload)"
+        return f"failed: {self.message}"
+
+
+def staging_settings() -> Dict[str, Any]:
+    """Return the software_staging section of config/tools.yml with defaults applied."""
+    try:
+        raw = load_config().get("software_staging") or {}
+    except FileNotFoundError:
+        raw = {}
+    image_dir = Path(raw.get("image_dir") or DEFAULT_IMAGE_DIR)
+    if not image_dir.is_absolute():
+        image_dir = _PROJECT_ROOT / image_dir
+    return {
+        "image_dir": image_dir,
+        "remote_dir": str(raw.get("remote_dir") or DEFAULT_REMOTE_DIR).rstrip("/"),
+        "chunk_size": int(raw.get("chunk_size_kb", DEFAULT_CHUNK_SIZE // 1024)) * 1024,
+        "retries": int(raw.get("retries", DEFAULT_RETRIES)),
+        "max_parallel": int(raw.get("max_parallel", DEFAULT_MAX_PARALLEL)),
+    }
+
+
+def resolve_local_image(name: str, image_dir: Path) -> Path:
+    """Resolve an image filename under image_dir (security: plain filenames only, no traversal)."""
+    raw = (name or "").strip()
+    if not raw or not _SAFE_NAME_RE.match(raw):
+        raise ValueError("local_image must be a plain filename (letters, digits, '.', '_', '-', '+')")
+    p = (image_dir / raw).resolve()
+    if not p.is_relative_to(image_dir.resolve()):
+        raise ValueError(f"local_image must resolve under {image_dir}")
+    if not p.is_file():
+        raise ValueError(f"image not found: {p}")
+    return p
+
+
+def local_sha256(path: Path) -> str:
+    st = path.stat()
+    key = (str(path), st.st_size, st.st_mtime)
+    digest = _local_digests.get(key)
+    if digest is None:
+        h = hashlib.sha256()
+        with path.open("rb") as f:
+            for block in iter(lambda: f.read(4 * 1024 * 1024), b""):
+                h.update(block)
+        digest = h.hexdigest()
+        _local_digests[key] = digest
+    return digest
+
+
+def _remote_sha256(client, chassis: Dict[str, Any], remote_path: str) -> str | None:
+    """Return the SHA-256 of a remote file via 'file checksum sha-256', or None if unavailable."""
+    wrapped, _ = wrap_cli_command(f"file checksum sha-256 {remote_path}", chassis)
+    _, stdout, _ = client.exec_command(wrapped, timeout=600)
+    out = stdout.read().decode("utf-8", errors="replace")
+    m = _SHA256_RE.search(out)
+    return m.group(1).lower() if m else None
+
+
+def _remote_size(sftp, path: str) -> int | None:
+    try:
+        return sftp.stat(path).st_size
+    except IOError:
+        return None
+
+
+def _upload(sftp, local: Path, part_path: str, chunk_size: int) -> int:
+    """Append the missing tail of local to part_path. Returns the number of bytes sent."""
+    total = local.stat().st_size
+    offset = _remote_size(sftp, part_path) or 0
+    if offset > total:
+        sftp.remove(part_path)
+        offset = 0
+    sent = 0
+    with local.open("rb") as src, sftp.open(part_path, "r+b" if offset else "wb") as dst:
+        # Pipelined: writes are not acknowledged one by one, so latency does not cap throughput
+        dst.set_pipelined(True)
+        src.seek(offset)
+        dst.seek(offset)
+        for block in iter(lambda: src.read(chunk_size), b""):
+            dst.write(block)
+            sent += len(block)
+    return sent
+
+
+def stage_image(
+    chassis: Dict[str, Any],
+    local: Path,
+    remote_dir: str = DEFAULT_REMOTE_DIR,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    retries: int = DEFAULT_RETRIES,
+) -> StageResult:
+    """Make sure local is present at remote_dir/<name> on chassis with a matching checksum."""
+    cid = chassis.get("id") or chassis["host"]
+    remote_path = f"{remote_dir}/{local.name}"
+    part_path = remote_path + ".part"
+    digest = local_sha256(local)
+    result = StageResult(cid, remote_path, "failed")
+    start = time.monotonic()
+    try:
+        # One session slot for all attempts (multi-process mode: shared with pooled commands)
+        with device_session(chassis):
+            for attempt in range(1, max(1, retries) + 1):
+                client = None
+                try:
+                    client = open_ssh_client(chassis)
+                    if _remote_sha256(client, chassis, remote_path) == digest:
+                        result.status = "present"
+                        break
+                    sftp = client.open_sftp()
+                    result.bytes_sent += _upload(sftp, local, part_path, chunk_size)
+                    if _remote_sha256(client, chassis, part_path) != digest:
+                        # Corrupt prefix (or the file changed locally): start over on the next attempt
+                        sftp.remove(part_path)
+                        raise IOError("checksum mismatch after upload")
+                    if _remote_size(sftp, remote_path) is not None:
+                        sftp.remove(remote_path)
+                    sftp.rename(part_path, remote_path)
+                    result.status = "uploaded"
+                    break
+                except Exception as e:
+                    result.message = f"{type(e).__name__}: {e}"
+                    logger.warning(
+                        "stage %s on %s (attempt %d/%d): %s", local.name, cid, attempt, retries, result.message
+                    )
+                finally:
+                    if client is not None:
+                        client.close()
+    except RuntimeError as e:
+        result.message = str(e)  # chassis busy
+    result.seconds = time.monotonic() - start
+    if result.ok:
+        result.message = ""
+    _log_tool_call(
+        "SOFTWARE STAGE RESULT",
+        chassis_id=cid,
+        image=local.name,
+        status=result.status,
+        bytes_sent=result.bytes_sent,
+        duration_ms=int(result.seconds * 1000),
+        message=result.message or None,
+    )
+    return result
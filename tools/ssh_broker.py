@@ -0,0 +1,406 @@
+"""
+Shared SSH broker for multi-process server mode (server.workers > 1 in config/tools.yml).
+
+Worker processes do not log in to devices themselves: run_cli_command_on_ptx and
+run_cli_stdin_on_ptx forward the call over a local Unix socket to a single broker process.
+The broker owns a small pool of SSH connections per chassis, reuses idle connections for
+later commands and caps concurrent sessions per chassis, so adding workers does not
+multiply device logins and the per-chassis limit holds for the whole server.
+
+SFTP staging and device log follows open their own connections, but first take a session
+slot from the broker (device_session), so they count against the same per-chassis limit.
+
+The broker also counts configuration changes per chassis (every stdin call, i.e.
+edit_configuration / rollback_configuration); workers compare that generation with their
+cached config snapshots and facts so a commit made through one worker is not hidden by
+another worker's cache.
+"""
+import atexit
+import multiprocessing
+import os
+import secrets
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from multiprocessing.connection import Client, Listener
+from typing import Any, Callable, Dict, Iterator, Tuple
+
+from tools.config_loader import load_config
+
+logger = __import__("logging").getLogger("ptx-mcp-server")
+
+BROKER_ADDRESS_ENV = "PTX_SSH_BROKER"
+BROKER_AUTHKEY_ENV = "PTX_SSH_BROKER_AUTHKEY"
+
+DEFAULT_WORKERS = 1
+DEFAULT_MAX_SESSIONS_PER_CHASSIS = 4
+DEFAULT_IDLE_TIMEOUT_SEC = 300
+DEFAULT_SESSION_WAIT_SEC = 60
+# Keepalives let the pool notice connections the device dropped while idle
+_KEEPALIVE_SEC = 30
+# Reused connections must open a channel within this long before a command is sent on them
+_PROBE_TIMEOUT_SEC = 5.0
+
+
+def server_settings() -> Dict[str, Any]:
+    """Return the server section of config/tools.yml with defaults applied."""
+    try:
+        raw = load_config().get("server") or {}
+    except FileNotFoundError:
+        raw = {}
+    socket_path = raw.get("broker_socket") or os.path.join(tempfile.gettempdir(), f"ptx-mcp-broker-{os.getpid()}.sock")
+    return {
+        "workers": max(1, int(raw.get("workers", DEFAULT_WORKERS))),
+        "broker_socket": str(socket_path),
+        "max_sessions_per_chassis": max(1, int(raw.get("max_sessions_per_chassis", DEFAULT_MAX_SESSIONS_PER_CHASSIS))),
+        "idle_timeout_sec": max(1.0, float(raw.get("idle_timeout_sec", DEFAULT_IDLE_TIMEOUT_SEC))),
+        "session_wait_sec": max(0.0, float(raw.get("session_wait_sec", DEFAULT_SESSION_WAIT_SEC))),
+    }
+
+
+def _device_key(chassis: Dict[str, Any]) -> str:
+    return f"{chassis['host']}:{chassis.get('port', 22)}"
+
+
+def _alive(client) -> bool:
+    t = client.get_transport()
+    return t is not None and t.is_active()
+
+
+def _usable(client) -> bool:
+    """Open and close a channel on an idle connection.
+
+    A connection the device dropped without the transport noticing fails here, before any
+    command has been sent on it, so replacing it can never run a command twice.
+    """
+    if not _alive(client):
+        return False
+    try:
+        client.get_transport().open_session(timeout=_PROBE_TIMEOUT_SEC).close()
+        return True
+    except Exception:
+        return False
+
+
+class SessionPool:
+    """SSH connections owned by the broker.
+
+    At most max_per_chassis commands run on one device (host:port) at a time, whatever
+    inventory entry, username or transport profile they come through; a command that gets
+    no slot within wait_sec fails as busy. Idle connections are reused only for the same
+    user and profile and closed after idle_timeout_sec.
+    """
+
+    def __init__(self, max_per_chassis: int, idle_timeout_sec: float, wait_sec: float = DEFAULT_SESSION_WAIT_SEC):
+        self.max_per_chassis = max_per_chassis
+        self.idle_timeout_sec = idle_timeout_sec
+        self.wait_sec = wait_sec
+        self._lock = threading.Lock()
+        self._slots: dict[str, threading.BoundedSemaphore] = {}
+        self._idle: dict[str, list[tuple[Any, float]]] = {}
+        self._stop = threading.Event()
+        self._reaper = threading.Thread(target=self._reap_loop, name="ssh-broker-reaper", daemon=True)
+        self._reaper.start()
+
+    @staticmethod
+    def _idle_key(chassis: Dict[str, Any]) -> str:
+        profile = (chassis.get("transport") or {}).get("name") or ""
+        return f"{chassis.get('username', '')}@{chassis['host']}:{chassis.get('port', 22)}/{profile}"
+
+    def _checkout(self, key: str):
+        while True:
+            with self._lock:
+                idle = self._idle.get(key)
+                if not idle:
+                    return None
+                client, _ = idle.pop()
+            # Probed outside the lock: a dead connection can take up to _PROBE_TIMEOUT_SEC
+            if _usable(client):
+                return client
+            client.close()
+
+    def _checkin(self, key: str, client) -> None:
+        if not _alive(client):
+            client.close()
+            return
+        with self._lock:
+            self._idle.setdefault(key, []).append((client, time.monotonic()))
+
+    def _connect(self, chassis: Dict[str, Any], timeout_sec: int):
+        from tools.common import open_ssh_client
+
+        client = open_ssh_client(chassis, timeout_sec=timeout_sec)
+        client.get_transport().set_keepalive(_KEEPALIVE_SEC)
+        return client
+
+    def _slot(self, chassis: Dict[str, Any]) -> threading.BoundedSemaphore:
+        with self._lock:
+            return self._slots.setdefault(_device_key(chassis), threading.BoundedSemaphore(self.max_per_chassis))
+
+    def acquire(self, chassis: Dict[str, Any]) -> bool:
+        """Take one of chassis' session slots, waiting up to wait_sec. Returns False if none freed up."""
+        return self._slot(chassis).acquire(timeout=self.wait_sec)
+
+    def release(self, chassis: Dict[str, Any]) -> None:
+        self._slot(chassis).release()
+
+    def busy_message(self, chassis: Dict[str, Any]) -> str:
+        return (
+            f"Chassis {_device_key(chassis)} busy: all {self.max_per_chassis} SSH sessions stayed in use "
+            f"for {self.wait_sec:g}s (server.max_sessions_per_chassis)"
+        )
+
+    def run(self, chassis: Dict[str, Any], fn: Callable[[Any], Tuple[bool, str]],
+            connect_timeout_sec: int = 30) -> Tuple[bool, str]:
+        """Run fn(client) on a pooled connection to chassis, waiting up to wait_sec for a free session slot."""
+        if not self.acquire(chassis):
+            return (False, self.busy_message(chassis))
+        try:
+            key = self._idle_key(chassis)
+            client = self._checkout(key) or self._connect(chassis, connect_timeout_sec)
+            try:
+                return fn(client)
+            finally:
+                self._checkin(key, client)
+        finally:
+            self.release(chassis)
+
+    def _reap_loop(self) -> None:
+        while not self._stop.wait(min(30.0, self.idle_timeout_sec)):
+            cutoff = time.monotonic() - self.idle_timeout_sec
+            expired = []
+            with self._lock:
+                for idle in self._idle.values():
+                    expired.extend(c for c, ts in idle if ts < cutoff)
+                    idle[:] = [(c, ts) for c, ts in idle if ts >= cutoff]
+            for client in expired:
+                client.close()
+
+    def close(self) -> None:
+        self._stop.set()
+        with self._lock:
+            clients = [c for idle in self._idle.values() for c, _ in idle]
+            self._idle.clear()
+        for client in clients:
+            client.close()
+
+
+# Set in the broker process only
+_pool: SessionPool | None = None
+# host:port -> number of configuration changes seen by the broker
+_generations: dict[str, int] = {}
+_generations_lock = threading.Lock()
+# Worker side: one broker connection per thread (requests on a connection are sequential)
+_local = threading.local()
+
+
+def _run_pooled(op: str, args: tuple) -> Any:
+    from tools.common import run_cli_command_on_ptx, run_cli_stdin_on_ptx
+
+    if op == "cli":
+        command, chassis, timeout_sec = args
+        return _pool.run(
+            chassis,
+            lambda c: run_cli_command_on_ptx(command, chassis, timeout_sec, client=c),
+            connect_timeout_sec=min(30, timeout_sec),
+        )
+    if op == "stdin":
+        command, stdin_content, chassis, timeout_sec = args
+        try:
+            return _pool.run(
+                chassis,
+                lambda c: run_cli_stdin_on_ptx(command, stdin_content, chassis, timeout_sec, client=c),
+                connect_timeout_sec=min(30, timeout_sec),
+            )
+        finally:
+            with _generations_lock:
+                key = _device_key(chassis)
+                _generations[key] = _generations.get(key, 0) + 1
+    if op == "generation":
+        (chassis,) = args
+        return _generations.get(_device_key(chassis), 0)
+    raise ValueError(f"unknown broker op {op!r}")
+
+
+def _call_broker(address: str, op: str, args: tuple) -> Any:
+    conn = getattr(_local, "conn", None)
+    for attempt in (1, 2):
+        try:
+            if conn is None:
+                conn = Client(address, family="AF_UNIX", authkey=bytes.fromhex(os.environ[BROKER_AUTHKEY_ENV]))
+                _local.conn = conn
+            conn.send((op, args))
+            break
+        except (OSError, EOFError) as e:
+            # Stale connection (broker restarted): reconnect once. Nothing was executed yet.
+            _local.conn = None
+            if conn is not None:
+                conn.close()
+            conn = None
+            if attempt == 2:
+                raise ConnectionError(f"SSH broker unavailable at {address}: {e}") from e
+    try:
+        status, value = conn.recv()
+    except (OSError, EOFError) as e:
+        _local.conn = None
+        conn.close()
+        raise ConnectionError(f"SSH broker connection lost: {e}") from e
+    if status == "error":
+        raise RuntimeError(value)
+    return value
+
+
+def dispatch(op: str, *args: Any) -> Tuple[bool, str] | None:
+    """Route an SSH call ('cli' or 'stdin') through the broker.
+
+    Returns None when not running in multi-process mode (the caller connects directly).
+    """
+    address = os.environ.get(BROKER_ADDRESS_ENV)
+    if _pool is None and not address:
+        return None
+    try:
+        if _pool is not None:
+            return _run_pooled(op, args)
+        return _call_broker(address, op, args)
+    except Exception as e:
+        logger.error("SSH broker %s: %s", op, e)
+        return (False, str(e))
+
+
+def config_generation(chassis: Dict[str, Any]) -> int:
+    """Return the broker's configuration change counter for chassis (0 in single-process mode)."""
+    address = os.environ.get(BROKER_ADDRESS_ENV)
+    if _pool is not None:
+        return _run_pooled("generation", (chassis,))
+    if not address:
+        return 0
+    try:
+        return _call_broker(address, "generation", (chassis,))
+    except Exception as e:
+        logger.warning("SSH broker generation: %s", e)
+        return -1  # never matches a stored generation: treat cached config as stale
+
+
+@contextmanager
+def device_session(chassis: Dict[str, Any]) -> Iterator[None]:
+    """Hold one of chassis' session slots around a connection made outside the pool.
+
+    For SFTP staging and device log follows, which need their own SSH connection: in
+    multi-process mode they count against max_sessions_per_chassis like pooled commands.
+    A no-op in single-process mode. Raises RuntimeError if no slot frees up in time.
+    """
+    address = os.environ.get(BROKER_ADDRESS_ENV)
+    if _pool is None and not address:
+        yield
+        return
+    if _pool is not None:
+        busy = None if _pool.acquire(chassis) else _pool.busy_message(chassis)
+    else:
+        busy = _call_broker(address, "acquire", (chassis,))
+    if busy is not None:
+        raise RuntimeError(busy)
+    try:
+        yield
+    finally:
+        if _pool is not None:
+            _pool.release(chassis)
+        else:
+            try:
+                _call_broker(address, "release", (chassis,))
+            except Exception as e:
+                # The broker releases a worker connection's slots when that connection closes
+                logger.warning("SSH broker release: %s", e)
+
+
+def _lease(op: str, chassis: Dict[str, Any], leases: list[Dict[str, Any]]) -> str | None:
+    """Take ('acquire') or return ('release') a session slot held by one worker connection.
+
+    'acquire' returns None on success or the busy message.
+    """
+    if op == "acquire":
+        if not _pool.acquire(chassis):
+            return _pool.busy_message(chassis)
+        leases.append(chassis)
+    elif chassis in leases:
+        # Not found: the worker reconnected and this connection's teardown already released it
+        leases.remove(chassis)
+        _pool.release(chassis)
+    return None
+
+
+def _serve_connection(conn) -> None:
+    # Slots taken over this connection; returned if the worker goes away without releasing them
+    leases: list[Dict[str, Any]] = []
+    try:
+        while True:
+            try:
+                op, args = conn.recv()
+            except EOFError:
+                return
+            try:
+                if op in ("acquire", "release"):
+                    reply = ("ok", _lease(op, args[0], leases))
+                else:
+                    reply = ("ok", _run_pooled(op, args))
+            except Exception as e:
+                reply = ("error", f"{type(e).__name__}: {e}")
+            conn.send(reply)
+    except OSError as e:
+        logger.info("SSH broker: worker connection closed: %s", e)
+    finally:
+        for chassis in leases:
+            _pool.release(chassis)
+        conn.close()
+
+
+def serve_broker(settings: Dict[str, Any], authkey: bytes, ready=None) -> None:
+    """Broker process main loop: accept worker connections, one thread per connection."""
+    global _pool
+    _pool = SessionPool(settings["max_sessions_per_chassis"], settings["idle_timeout_sec"], settings["session_wait_sec"])
+    address = settings["broker_socket"]
+    if os.path.exists(address):
+        os.unlink(address)
+    listener = Listener(address, family="AF_UNIX", authkey=authkey)
+    os.chmod(address, 0o600)
+    # Telemetry is collected once per server, from here, through the same session pool
+    from tools.telemetry_poller import start_telemetry_poller
+
+    start_telemetry_poller()
+    logger.info(
+        "SSH broker listening on %s (max %d sessions per chassis)", address, settings["max_sessions_per_chassis"]
+    )
+    if ready is not None:
+        ready.set()
+    while True:
+        try:
+            conn = listener.accept()
+        except (OSError, multiprocessing.AuthenticationError) as e:
+            logger.warning("SSH broker: rejected connection: %s", e)
+            continue
+        threading.Thread(target=_serve_connection, args=(conn,), name="ssh-broker-conn", daemon=True).start()
+
+
+def start_broker_process(settings: Dict[str, Any]) -> multiprocessing.Process:
+    """Start the broker and point worker processes started afterwards at it (via environment)."""
+    authkey = secrets.token_bytes(32)
+    ctx = multiprocessing.get_context("spawn")
+    ready = ctx.Event()
+    proc = ctx.Process(target=serve_broker, args=(settings, authkey, ready), name="ptx-ssh-broker", daemon=True)
+    proc.start()
+    deadline = time.monotonic() + 60
+    while not ready.wait(timeout=0.5):
+        if not proc.is_alive() or time.monotonic() > deadline:
+            proc.terminate()
+            raise RuntimeError(f"SSH broker process did not start (exit code {proc.exitcode})")
+    atexit.register(_remove_socket, settings["broker_socket"])
+    os.environ[BROKER_ADDRESS_ENV] = settings["broker_socket"]
+    os.environ[BROKER_AUTHKEY_ENV] = authkey.hex()
+    return proc
+
+
+def _remove_socket(path: str) -> None:
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
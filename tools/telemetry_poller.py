@@ -0,0 +1,297 @@
+"""
+Optional background telemetry poller.
+
+Polls a configured set of 'show' commands on each selected chassis, spread out with
+jitter, parses numeric counters out of the output and appends them to the local
+TelemetryStore. Enabled via the 'telemetry' section of config/tools.yml.
+"""
+import heapq
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict
+
+from tools.chassis_manager import load_chassis_config, select_chassis
+from tools.common import run_cli_command_on_ptx
+from tools.config_loader import load_config
+from tools.telemetry_store import TelemetryStore
+
+logger = __import__("logging").getLogger("ptx-mcp-server")
+
+_PROJECT_ROOT = Path(__file__).resolve().parent.parent
+_DEFAULT_DB_PATH = _PROJECT_ROOT / "data" / "telemetry.db"
+
+_DEFAULT_POLLS = [
+    {"command": "show chassis routing-engine", "parser": "routing_engine", "interval_sec": 60},
+    {"command": "show chassis alarms", "parser": "alarms", "interval_sec": 60},
+    # Quoted: without cli_invoke: cli-quoted the login shell would glob 'et-*'
+    {"command": 'show interfaces "et-*"', "parser": "interface_rates", "interval_sec": 300},
+]
+
+# How often the scheduler re-reads the chassis selection and prunes the store
+_RESYNC_SEC = 60.0
+_PRUNE_SEC = 600.0
+
+
+def _slug(label: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "_", label.strip().lower()).strip("_")
+
+
+_RE_SLOT_RE = re.compile(r"^\s*Slot\s+(\d+)\s*:")
+_RE_CPU_HEADER_RE = re.compile(r"^(\s*)(.*CPU utilization)\s*:\s*$", re.I)
+_RE_PERCENT_RE = re.compile(r"^\s*([A-Za-z][A-Za-z ()/-]*?)\s+(\d+(?:\.\d+)?)\s+percent\b")
+_RE_TEMP_RE = re.compile(r"^\s*((?:[A-Za-z]+ )*temperature)\s+(-?\d+)\s+degrees C", re.I)
+
+
+def parse_routing_engine(output: str) -> list[tuple[str, float]]:
+    """'show chassis routing-engine' -> re<slot>.memory_utilization_pct, re<slot>.cpu_idle_pct, ..."""
+    samples = []
+    slot = "0"
+    # (indent, prefix) of the current 'CPU utilization:' block; its entries are indented deeper
+    cpu_block: tuple[int, str] | None = None
+    for line in output.splitlines():
+        indent = len(line) - len(line.lstrip())
+        if cpu_block and line.strip() and indent <= cpu_block[0]:
+            cpu_block = None
+        m = _RE_SLOT_RE.match(line)
+        if m:
+            slot = m.group(1)
+            continue
+        m = _RE_CPU_HEADER_RE.match(line)
+        if m:
+            cpu_block = (len(m.group(1)), _slug(m.group(2).lower().replace("utilization", "")))
+            continue
+        m = _RE_PERCENT_RE.match(line)
+        if m:
+            label = _slug(m.group(1))
+            if cpu_block:
+                label = f"{cpu_block[1]}_{label}"
+            samples.append((f"re{slot}.{label}_pct", float(m.group(2))))
+            continue
+        m = _RE_TEMP_RE.match(line)
+        if m:
+            samples.append((f"re{slot}.{_slug(m.group(1))}_c", float(m.group(2))))
+    return samples
+
+
+_ALARM_COUNT_RE = re.compile(r"(\d+)\s+alarms?\s+currently\s+active", re.I)
+# Alarm rows: '<date> <time> [<tz>]  <Class>  <Description>'
+_ALARM_CLASS_RE = re.compile(r"^\s*\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}(?: [A-Z]+)?\s+(Major|Minor)\b", re.M)
+
+
+def parse_alarms(output: str) -> list[tuple[str, float]]:
+    """'show chassis alarms' / 'show system alarms' -> alarms.active, alarms.major, alarms.minor."""
+    if re.search(r"no alarms currently active", output, re.I):
+        return [("alarms.active", 0.0), ("alarms.major", 0.0), ("alarms.minor", 0.0)]
+    m = _ALARM_COUNT_RE.search(output)
+    if not m:
+        return []
+    classes = _ALARM_CLASS_RE.findall(output)
+    major, minor = classes.count("Major"), classes.count("Minor")
+    return [("alarms.active", float(m.group(1))), ("alarms.major", float(major)), ("alarms.minor", float(minor))]
+
+
+_IFD_RE = re.compile(r"^Physical interface:\s*([^,\s]+)")
+_RATE_RE = re.compile(r"^\s*(Input|Output) rate\s*:\s*(\d+)\s*bps\s*\((\d+)\s*pps\)")
+
+
+def parse_interface_rates(output: str) -> list[tuple[str, float]]:
+    """'show interfaces ...' -> interface.<ifd>.input_bps / input_pps / output_bps / output_pps."""
+    samples = []
+    ifd = None
+    for line in output.splitlines():
+        m = _IFD_RE.match(line)
+        if m:
+            ifd = m.group(1)
+            continue
+        m = _RATE_RE.match(line)
+        if m and ifd:
+            direction = m.group(1).lower()
+            samples.append((f"interface.{ifd}.{direction}_bps", float(m.group(2))))
+            samples.append((f"interface.{ifd}.{direction}_pps", float(m.group(3))))
+    return samples
+
+
+def make_regex_parser(patterns: Dict[str, str]) -> Callable[[str], list[tuple[str, float]]]:
+    """Build a parser from {metric: regex}; the first group of the first match is the value."""
+    compiled = {name: re.compile(rx, re.M) for name, rx in patterns.items()}
+
+    def parse(output: str) -> list[tuple[str, float]]:
+        samples = []
+        for name, rx in compiled.items():
+            m = rx.search(output)
+            if m:
+                try:
+                    samples.append((name, float(m.group(1))))
+                except (IndexError, ValueError):
+                    continue
+        return samples
+
+    return parse
+
+
+PARSERS: Dict[str, Callable[[str], list[tuple[str, float]]]] = {
+    "routing_engine": parse_routing_engine,
+    "alarms": parse_alarms,
+    "interface_rates": parse_interface_rates,
+}
+
+
+def _build_polls(raw: list[Any]) -> list[dict[str, Any]]:
+    polls = []
+    for entry in raw:
+        if not isinstance(entry, dict) or not entry.get("command"):
+            logger.warning("telemetry: skipping poll entry without 'command': %r", entry)
+            continue
+        name = str(entry.get("parser", "")).strip()
+        if name == "regex":
+            parser = make_regex_parser({str(k): str(v) for k, v in (entry.get("patterns") or {}).items()})
+        elif name in PARSERS:
+            parser = PARSERS[name]
+        else:
+            logger.warning("telemetry: unknown parser %r for %r", name, entry["command"])
+            continue
+        polls.append(
+            {
+                "command": str(entry["command"]).strip(),
+                "parser": parser,
+                "interval_sec": max(10.0, float(entry.get("interval_sec", 60))),
+                "timeout_sec": int(entry.get("timeout_sec", 60)),
+            }
+        )
+    return polls
+
+
+class TelemetryPoller:
+    """Scheduler thread + worker pool. Each (chassis, poll) job runs every interval ± jitter."""
+
+    def __init__(self, store: TelemetryStore, polls: list[dict[str, Any]], selector: str | None,
+                 jitter_sec: float = 10.0, max_workers: int = 8):
+        self.store = store
+        self.polls = polls
+        self.selector = selector
+        self.jitter_sec = jitter_sec
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="telemetry")
+        self._heap: list[tuple[float, str, int]] = []
+        self._targets: set[str] = set()
+        self._inflight: set[tuple[str, int]] = set()
+        self._inflight_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="telemetry-scheduler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join(timeout=5)
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _sync_targets(self, now: float) -> None:
+        """Pick up chassis added to / removed from the selection; new ones start at a random offset."""
+        current = set(select_chassis(self.selector))
+        for cid in current - self._targets:
+            for idx, poll in enumerate(self.polls):
+                heapq.heappush(self._heap, (now + random.uniform(0, poll["interval_sec"]), cid, idx))
+        self._targets = current
+
+    def _next_due(self, poll: dict[str, Any], now: float) -> float:
+        return now + poll["interval_sec"] + random.uniform(-self.jitter_sec, self.jitter_sec)
+
+    def _run(self) -> None:
+        next_sync = next_prune = 0.0
+        while not self._stop.is_set():
+            now = time.time()
+            if now >= next_sync:
+                try:
+                    self._sync_targets(now)
+                except Exception as e:
+                    logger.error("telemetry: cannot resolve chassis selection: %s", e)
+                next_sync = now + _RESYNC_SEC
+            if now >= next_prune:
+                try:
+                    self.store.prune(now)
+                except Exception as e:
+                    logger.error("telemetry: prune failed: %s", e)
+                next_prune = now + _PRUNE_SEC
+            while self._heap and self._heap[0][0] <= now:
+                _, cid, idx = heapq.heappop(self._heap)
+                if cid not in self._targets:
+                    continue
+                heapq.heappush(self._heap, (self._next_due(self.polls[idx], now), cid, idx))
+                with self._inflight_lock:
+                    if (cid, idx) in self._inflight:
+                        continue  # previous poll still running (slow device); skip this round
+                    self._inflight.add((cid, idx))
+                self._pool.submit(self._poll_one, cid, idx)
+            wake = min(next_sync, next_prune, self._heap[0][0] if self._heap else next_sync)
+            self._stop.wait(max(0.05, wake - time.time()))
+
+    def _poll_one(self, cid: str, idx: int) -> None:
+        poll = self.polls[idx]
+        try:
+            chassis = load_chassis_config().get(cid)
+            if chassis is None:
+                return
+            ok, out = run_cli_command_on_ptx(poll["command"], chassis, timeout_sec=poll["timeout_sec"])
+            if not ok:
+                logger.warning("telemetry: %s on %s failed: %s", poll["command"], cid, out[:200])
+                return
+            self.store.append(cid, poll["parser"](out))
+        except Exception as e:
+            logger.error("telemetry: %s on %s: %s", poll["command"], cid, e)
+        finally:
+            with self._inflight_lock:
+                self._inflight.discard((cid, idx))
+
+
+_store: TelemetryStore | None = None
+_poller: TelemetryPoller | None = None
+
+
+def _telemetry_settings() -> dict[str, Any]:
+    try:
+        return load_config().get("telemetry") or {}
+    except FileNotFoundError:
+        return {}
+
+
+def get_telemetry_store() -> TelemetryStore:
+    """Return the shared store (opened on first use, also when the poller is disabled)."""
+    global _store
+    if _store is None:
+        settings = _telemetry_settings()
+        db_path = Path(settings.get("db_path") or _DEFAULT_DB_PATH)
+        if not db_path.is_absolute():
+            db_path = _PROJECT_ROOT / db_path
+        _store = TelemetryStore(
+            db_path,
+            retention_sec=float(settings.get("retention_hours", 24)) * 3600,
+            rollup_retention_sec=float(settings.get("rollup_retention_days", 30)) * 86400,
+        )
+    return _store
+
+
+def start_telemetry_poller() -> TelemetryPoller | None:
+    """Start the background poller if telemetry.enabled is set in config/tools.yml."""
+    global _poller
+    settings = _telemetry_settings()
+    if not settings.get("enabled") or _poller is not None:
+        return _poller
+    polls = _build_polls(settings.get("polls") or _DEFAULT_POLLS)
+    if not polls:
+        logger.warning("telemetry: enabled but no valid polls configured")
+        return None
+    _poller = TelemetryPoller(
+        get_telemetry_store(),
+        polls,
+        selector=settings.get("selector"),
+        jitter_sec=float(settings.get("jitter_sec", 10)),
+        max_workers=int(settings.get("max_workers", 8)),
+    )
+    _poller.start()
+    logger.info("telemetry: poller started (%d polls per chassis)", len(polls))
+    return _poller
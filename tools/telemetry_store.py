@@ -0,0 +1,135 @@
+"""
+Local time-series store for polled telemetry (SQLite, stdlib only).
+
+Raw samples are kept for a short retention window; every sample is also folded into
+5-minute rollups (count/sum/min/max) that are kept longer, so trend queries over long
+windows stay cheap after raw data has been pruned.
+"""
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Iterable
+
+logger = __import__("logging").getLogger("ptx-mcp-server")
+
+ROLLUP_SEC = 300
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS samples (
+    chassis TEXT NOT NULL,
+    metric  TEXT NOT NULL,
+    ts      REAL NOT NULL,
+    value   REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS samples_by_metric ON samples (chassis, metric, ts);
+CREATE INDEX IF NOT EXISTS samples_by_ts ON samples (ts);
+CREATE TABLE IF NOT EXISTS rollups (
+    chassis TEXT NOT NULL,
+    metric  TEXT NOT NULL,
+    bucket  INTEGER NOT NULL,
+    n       INTEGER NOT NULL,
+    sum     REAL NOT NULL,
+    min     REAL NOT NULL,
+    max     REAL NOT NULL,
+    last    REAL NOT NULL,
+    PRIMARY KEY (chassis, metric, bucket)
+);
+CREATE TABLE IF NOT EXISTS latest (
+    chassis TEXT NOT NULL,
+    metric  TEXT NOT NULL,
+    ts      REAL NOT NULL,
+    value   REAL NOT NULL,
+    PRIMARY KEY (chassis, metric)
+);
+"""
+
+
+def _glob_to_like(pattern: str) -> str:
+    """Translate a '*'/'?' glob to a SQL LIKE pattern (escape char: backslash)."""
+    out = pattern.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return out.replace("*", "%").replace("?", "_")
+
+
+class TelemetryStore:
+    """Thread-safe SQLite store. One connection, serialized by a lock (writes are tiny)."""
+
+    def __init__(self, path: Path, retention_sec: float = 24 * 3600, rollup_retention_sec: float = 30 * 86400):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.retention_sec = retention_sec
+        self.rollup_retention_sec = rollup_retention_sec
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def append(self, chassis: str, samples: Iterable[tuple[str, float]], ts: float | None = None) -> int:
+        """Append (metric, value) samples for chassis at ts (default now). Returns the count written."""
+        ts = time.time() if ts is None else ts
+        rows = [(chassis, metric, ts, float(value)) for metric, value in samples]
+        if not rows:
+            return 0
+        bucket = int(ts // ROLLUP_SEC) * ROLLUP_SEC
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT INTO samples VALUES (?, ?, ?, ?)", rows)
+            self._conn.executemany(
+                "INSERT INTO latest VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (chassis, metric) DO UPDATE SET ts = excluded.ts, value = excluded.value",
+                rows,
+            )
+            self._conn.executemany(
+                "INSERT INTO rollups VALUES (?, ?, ?, 1, ?, ?, ?, ?) "
+                "ON CONFLICT (chassis, metric, bucket) DO UPDATE SET "
+                "n = n + 1, sum = sum + excluded.sum, min = MIN(min, excluded.min), "
+                "max = MAX(max, excluded.max), last = excluded.last",
+                [(c, m, bucket, v, v, v, v) for c, m, _, v in rows],
+            )
+        return len(rows)
+
+    def prune(self, now: float | None = None) -> None:
+        """Drop raw samples and rollups older than their retention windows."""
+        now = time.time() if now is None else now
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM samples WHERE ts < ?", (now - self.retention_sec,))
+            self._conn.execute("DELETE FROM rollups WHERE bucket < ?", (now - self.rollup_retention_sec,))
+            self._conn.execute("DELETE FROM latest WHERE ts < ?", (now - self.rollup_retention_sec,))
+
+    def latest(self, chassis: str, metric: str = "*") -> list[tuple[str, float, float]]:
+        """Return [(metric, ts, value), ...] for the most recent sample of each matching metric."""
+        with self._lock:
+            cur = self._conn.execute(
+                "SELECT metric, ts, value FROM latest WHERE chassis = ? AND metric LIKE ? ESCAPE '\\' "
+                "ORDER BY metric",
+                (chassis, _glob_to_like(metric)),
+            )
+            return cur.fetchall()
+
+    def series(self, chassis: str, metric: str, since: float) -> dict[str, list[tuple[float, float, float, float]]]:
+        """Return {metric: [(ts, value, min, max), ...]} for matching metrics since a timestamp.
+
+        Raw samples are used while the window fits raw retention; otherwise 5-minute rollups
+        (value = bucket average) are returned.
+        """
+        use_raw = since >= time.time() - self.retention_sec
+        if use_raw:
+            sql = (
+                "SELECT metric, ts, value, value, value FROM samples "
+                "WHERE chassis = ? AND metric LIKE ? ESCAPE '\\' AND ts >= ? ORDER BY metric, ts"
+            )
+        else:
+            sql = (
+                "SELECT metric, bucket, sum / n, min, max FROM rollups "
+                "WHERE chassis = ? AND metric LIKE ? ESCAPE '\\' AND bucket >= ? ORDER BY metric, bucket"
+            )
+        with self._lock:
+            rows = self._conn.execute(sql, (chassis, _glob_to_like(metric), since)).fetchall()
+        out: dict[str, list[tuple[float, float, float, float]]] = {}
+        for m, ts, value, lo, hi in rows:
+            out.setdefault(m, []).append((ts, value, lo, hi))
+        return out
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,29 @@
+"""MCP tool: stop a follow_log subscription (or list active subscriptions)."""
+from mcp.server.fastmcp import Context
+
+from tools.log_follow import list_subscriptions, stop_subscription
+
+
+async def unfollow_log(ctx: Context, subscription_id: str | None = None) -> str:
+    """
+    Stop a log subscription started with follow_log by this client.
+
+    Args:
+        subscription_id: ID returned by follow_log. If omitted, lists active subscriptions instead.
+    """
+    if not subscription_id:
+        subs = list_subscriptions(ctx.session)
+        if not subs:
+            return "No active log subscriptions."
+        return "Active log subscriptions:\n" + "\n".join(f"  {s.describe()}" for s in subs)
+    sub = stop_subscription(subscription_id.strip(), ctx.session)
+    if sub is None:
+        return f"Error: unknown subscription '{subscription_id}'. Call unfollow_log() to list active ones."
+    return f"Stopped {sub.id} ({sub.target}): sent {sub.sent} lines, dropped {sub.dropped}."
+
+
+def register(mcp):
+    """Register this tool with the FastMCP server."""
+    if mcp.settings.stateless_http:
+        return  # follow_log is not registered either (see follow_log.register)
+    mcp.tool()(unfollow_log)